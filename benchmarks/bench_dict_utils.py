@@ -0,0 +1,174 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for dict_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_dict_utils.py
+'''
+import copy
+import json
+import timeit
+import tracemalloc
+from functools import partial, reduce
+
+from python_utils.dict_utils import (
+    BiDict,
+    KeyProjector,
+    coerce_datatypes,
+    compile_converter,
+    dict_with_required_keys,
+    get_key_by_val,
+    replace_keys,
+    trim_dict_values,
+    trim_records,
+    trim_values,
+)
+
+
+def _reduce_dict_with_required_keys(content: dict, required_keys: tuple) -> dict:
+    '''Original reduce based implementation of dict_with_required_keys, kept as a baseline.'''
+    def reducer(accum, key):
+        val = content.get(key)
+
+        if val is None:
+            raise KeyError(key)
+
+        return {**accum, key: val}
+
+    return reduce(reducer, required_keys, {})
+
+
+def _recursive_replace_keys(item, new_key_mapping):
+    '''Original recursive implementation of replace_keys, kept as a baseline.'''
+    if isinstance(item, dict):
+        return {
+            new_key_mapping.get(key, key): _recursive_replace_keys(val, new_key_mapping)
+            for key, val in item.items()
+        }
+
+    if isinstance(item, list):
+        return [_recursive_replace_keys(el, new_key_mapping) for el in item]
+
+    return item
+
+
+def _try_trim_dict_values(untrimmed: dict) -> dict:
+    '''Original try/except implementation of trim_dict_values, kept as a baseline.'''
+    def trim_if_string(subject):
+        try:
+            return subject.strip()
+        except AttributeError:
+            return subject
+
+    return {k: trim_if_string(v) for k, v in untrimmed.items()}
+
+
+def _report(name, seconds, number):
+    print(f'{name:<45} {seconds / number * 1e6:>10.2f} us/call')
+
+
+def bench_dict_with_required_keys(field_count=60, number=20000):
+    record = {f'field_{i}': i for i in range(field_count * 2)}
+    required_keys = tuple(f'field_{i}' for i in range(field_count))
+    project = KeyProjector(required_keys)
+
+    print(f'dict_with_required_keys, {field_count} required keys')
+    for name, func in (
+            ('reduce baseline', partial(_reduce_dict_with_required_keys, record, required_keys)),
+            ('dict_with_required_keys', partial(dict_with_required_keys, record, required_keys)),
+            ('KeyProjector (prebuilt)', partial(project, record)),
+        ):
+        _report(name, timeit.timeit(func, number=number), number)
+
+    records = [record] * 10000
+    seconds = timeit.timeit(partial(project.project_many, records), number=10)
+    _report('KeyProjector.project_many (per record)', seconds, 10 * len(records))
+
+
+def bench_coerce_datatypes(field_count=40, row_count=20000):
+    datatype_map = {
+        f'field_{i}': {'conversion_function': int, 'default': 0} if i % 2 else {'conversion_function': str}
+        for i in range(field_count)
+    }
+    rows = [{f'field_{i}': str(i) for i in range(0, field_count, 2)} for _ in range(row_count)]
+    convert = compile_converter(datatype_map)
+
+    print(f'coerce_datatypes, {field_count} fields, {row_count} rows')
+    for name, func in (
+            ('coerce_datatypes per row', lambda: [coerce_datatypes(datatype_map, _) for _ in rows]),
+            ('compile_converter().coerce_many', lambda: convert.coerce_many(rows)),
+        ):
+        _report(name, timeit.timeit(func, number=1), row_count)
+
+
+def _event(i):
+    return {
+        'eventId': i,
+        'detail': {
+            'user': {'userName': f'user_{i}', 'groups': ['a', 'b', 'c']},
+            'items': [{'sku': f'sku_{j}', 'price': j * 1.5, 'tags': ['x', 'y']} for j in range(5)],
+        },
+    }
+
+
+def bench_replace_keys(target_mb=10):
+    event_size = len(json.dumps(_event(0)))
+    document = json.loads(json.dumps([_event(i) for i in range(target_mb * 2 ** 20 // event_size)]))
+    print(f'replace_keys, {len(json.dumps(document)) / 2 ** 20:.1f} MB JSON document')
+
+    for mapping_name, new_key_mapping in (
+            ('no matching keys', {'missing': 'other'}),
+            ('one rare key', {'userName': 'user_name'}),
+            ('one common key', {'sku': 'item_sku'}),
+        ):
+        cases = (
+            ('recursive baseline', lambda doc: _recursive_replace_keys(doc, new_key_mapping)),
+            ('replace_keys', lambda doc: replace_keys(doc, new_key_mapping)),
+            ('replace_keys in_place', lambda doc: replace_keys(doc, new_key_mapping, in_place=True)),
+        )
+        for name, func in cases:
+            seconds = min(timeit.timeit(partial(func, copy.deepcopy(document)), number=1) for _ in range(3))
+
+            # tracemalloc slows everything down, so measure memory in a separate run
+            doc = copy.deepcopy(document)
+            tracemalloc.start()
+            func(doc)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{name + ", " + mapping_name:<45} {seconds * 1e3:>10.2f} ms {peak / 2 ** 20:>8.1f} MB peak')
+
+
+def bench_get_key_by_val(entry_count=50000, number=1000):
+    codes = {f'code_{i}': f'description {i}' for i in range(entry_count)}
+    bidict_codes = BiDict(codes)
+    target = f'description {entry_count // 2}'
+
+    print(f'get_key_by_val, {entry_count} entries')
+    for name, subject in (('dict', codes), ('BiDict', bidict_codes)):
+        _report(name, timeit.timeit(partial(get_key_by_val, subject, target), number=number), number)
+
+
+def bench_trim(record_count=20000):
+    # mostly non-string values, like rows of a numeric sheet
+    records = [
+        {**{f'num_{i}': i * 1.5 for i in range(16)}, **{f'str_{i}': f'  value {i} ' for i in range(4)}}
+        for _ in range(record_count)
+    ]
+
+    print(f'trim dict values, {record_count} records of 20 fields')
+    for name, func in (
+            ('try/except baseline per record', lambda: [_try_trim_dict_values(_) for _ in records]),
+            ('trim_dict_values per record', lambda: [trim_dict_values(_) for _ in records]),
+            ('trim_records', lambda: trim_records(records)),
+            ('trim_records recursive', lambda: trim_records(records, recursive=True)),
+            ('trim_values on the list', lambda: trim_values(records)),
+        ):
+        _report(name, timeit.timeit(func, number=1), record_count)
+
+
+if __name__ == '__main__':
+    bench_dict_with_required_keys()
+    bench_coerce_datatypes()
+    bench_replace_keys()
+    bench_get_key_by_val()
+    bench_trim()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for env_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_env_utils.py
+'''
+import os
+import timeit
+from typing import TypedDict
+
+from python_utils.env_utils import getenv_bool, getenv_int, getenv_str, load_env_config, refresh_env_config
+
+VARIABLE_COUNT = 10
+
+# A schema like a lambda cold start reads, with strings, ints and bools
+Config = TypedDict('Config', {
+    **{f'BENCH_STR_{i}': str for i in range(VARIABLE_COUNT)},
+    **{f'BENCH_INT_{i}': int for i in range(VARIABLE_COUNT)},
+    **{f'BENCH_BOOL_{i}': bool for i in range(VARIABLE_COUNT)},
+})
+
+
+def _read_per_call():
+    return {
+        **{f'BENCH_STR_{i}': getenv_str(f'BENCH_STR_{i}') for i in range(VARIABLE_COUNT)},
+        **{f'BENCH_INT_{i}': getenv_int(f'BENCH_INT_{i}', None) for i in range(VARIABLE_COUNT)},
+        **{f'BENCH_BOOL_{i}': getenv_bool(f'BENCH_BOOL_{i}', None) for i in range(VARIABLE_COUNT)},
+    }
+
+
+def _load_uncached():
+    refresh_env_config()
+    return load_env_config(Config)
+
+
+def bench_load_env_config(number=2000):
+    for i in range(VARIABLE_COUNT):
+        os.environ[f'BENCH_STR_{i}'] = f' "value {i}" '
+        os.environ[f'BENCH_INT_{i}'] = str(i)
+        os.environ[f'BENCH_BOOL_{i}'] = 'true'
+
+    assert _read_per_call() == _load_uncached()
+
+    print(f'read {VARIABLE_COUNT * 3} environment variables')
+    for name, func in (
+            ('getenv_* per variable', _read_per_call),
+            ('load_env_config after refresh_env_config', _load_uncached),
+            ('load_env_config, cached', lambda: load_env_config(Config)),
+        ):
+        seconds = timeit.timeit(func, number=number)
+        print(f'{name:<45} {seconds / number * 1e6:>10.2f} us/call')
+
+
+if __name__ == '__main__':
+    bench_load_env_config()
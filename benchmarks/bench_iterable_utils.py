@@ -0,0 +1,115 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for iterable_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_iterable_utils.py
+'''
+import json
+import os
+import re
+import timeit
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import reduce
+
+from aws_utils.boto_utils import batch_parameter_sets, convert_to_parameter_set, estimate_parameter_set_size
+from python_utils.iterable_utils import batched, bucketize, lazy_partition, parallel_partition, partition, windowed
+
+
+def _reduce_partition(subject, filter_func):
+    '''Original reduce based implementation of partition, kept as a baseline.'''
+    def reducer(accum, el):
+        if filter_func(el):
+            return (*accum[0], el), accum[1]
+
+        return accum[0], (*accum[1], el)
+
+    return reduce(reducer, subject, ((), ()))
+
+
+def _report(name, seconds):
+    print(f'{name:<45} {seconds * 1e3:>10.2f} ms')
+
+
+def bench_partition():
+    is_even = lambda x: x % 2 == 0
+
+    def consume_lazy(subject):
+        evens, odds = lazy_partition(subject, is_even)
+        deque(evens, maxlen=0)
+        deque(odds, maxlen=0)
+
+    for element_count in (1000, 10000, 30000, 100000, 1000000):
+        subject = list(range(element_count))
+        print(f'partition, {element_count} elements')
+
+        # the baseline is quadratic, so only run it where it finishes in reasonable time
+        if element_count <= 30000:
+            _report('reduce baseline', timeit.timeit(lambda: _reduce_partition(subject, is_even), number=1))
+
+        _report('partition', timeit.timeit(lambda: partition(subject, is_even), number=1))
+        _report('lazy_partition', timeit.timeit(lambda: consume_lazy(subject), number=1))
+        _report('bucketize, 10 buckets', timeit.timeit(lambda: bucketize(subject, lambda x: x % 10), number=1))
+
+
+EMAIL_RE = re.compile(r'^([a-z0-9]+[._-]?)*[a-z0-9]+@([a-z0-9-]+\.)+[a-z]{2,}$')
+
+
+def _is_valid_email(subject: str) -> bool:
+    '''Regex heavy predicate, standing in for expensive validation.'''
+    return all(EMAIL_RE.match(subject) for _ in range(20))
+
+
+def bench_parallel_partition(element_count=20000):
+    subject = [f'user.{i}@example.com' if i % 3 else f'user {i}' for i in range(element_count)]
+    worker_count = os.cpu_count() or 1
+
+    print(f'partition with expensive predicate, {element_count} elements, {worker_count} cpus')
+    _report('partition', timeit.timeit(lambda: partition(subject, _is_valid_email), number=1))
+
+    for name, executor_class in (('threads', ThreadPoolExecutor), ('processes', ProcessPoolExecutor)):
+        with executor_class(worker_count) as executor:
+            _report(f'parallel_partition, {worker_count} {name}', timeit.timeit(
+                lambda: parallel_partition(subject, _is_valid_email, executor), number=1))
+
+
+def _slice_batches(subject, max_items):
+    '''Slicing over a materialized list, as callers did before batched, kept as a baseline.'''
+    items = list(subject)
+    return [items[i:i + max_items] for i in range(0, len(items), max_items)]
+
+
+def _json_size_batches(parameter_sets, max_sets, max_bytes):
+    '''Greedy batching sized with json.dumps, kept as a baseline for the size estimator.'''
+    return batched(parameter_sets, max_sets, max_bytes, lambda ps: len(json.dumps(ps)) + 2)
+
+
+def bench_batched(element_count=100000):
+    parameter_sets = [
+        convert_to_parameter_set({'id': i, 'name': f'user {i}', 'score': i / 7, 'active': i % 2 == 0})
+        for i in range(element_count)
+    ]
+    print(f'batched, {element_count} elements')
+
+    _report('slice materialized list', timeit.timeit(
+        lambda: _slice_batches((x for x in range(element_count)), 1000), number=1))
+    _report('batched, by count', timeit.timeit(
+        lambda: deque(batched((x for x in range(element_count)), 1000), maxlen=0), number=1))
+    _report('windowed, size 10', timeit.timeit(
+        lambda: deque(windowed(range(element_count), 10), maxlen=0), number=1))
+
+    _report('json.dumps size, parameter sets', timeit.timeit(
+        lambda: [len(json.dumps(ps)) for ps in parameter_sets], number=1))
+    _report('estimate_parameter_set_size', timeit.timeit(
+        lambda: [estimate_parameter_set_size(ps) for ps in parameter_sets], number=1))
+    _report('batched by json.dumps size', timeit.timeit(
+        lambda: deque(_json_size_batches(parameter_sets, 1000, 64 * 1024), maxlen=0), number=1))
+    _report('batch_parameter_sets', timeit.timeit(
+        lambda: deque(batch_parameter_sets(parameter_sets, 1000, 64 * 1024), maxlen=0), number=1))
+
+
+if __name__ == '__main__':
+    bench_partition()
+    bench_parallel_partition()
+    bench_batched()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for json_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_json_utils.py
+'''
+import json
+import os
+import tempfile
+import timeit
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from aws_utils.http_exceptions import ResponseTooLarge
+from aws_utils.http_response import streamed_success_response, success_response
+from python_utils import json_utils
+from python_utils.json_utils import NdjsonWriter, decimal_default, dump, dumps_bytes, iter_ndjson, loads, read_ndjson
+
+
+def _report(name, seconds):
+    print(f'{name:<45} {seconds * 1e3:>10.2f} ms')
+
+
+def _best_of(func, repeat=3):
+    '''Return the fastest of repeat timings of func, for timings too short to ignore noise.'''
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def _make_items(item_count):
+    '''DynamoDB style items, where every number is a Decimal.'''
+    return [
+        {
+            'id': str(UUID(int=i)),
+            'price': Decimal(f'{i % 1000}.{i % 100:02d}'),
+            'quantity': Decimal(i % 50),
+            'weight': Decimal('0.125'),
+            'name': f'item {i}',
+            'tags': ['new', 'sale'],
+        }
+        for i in range(item_count)
+    ]
+
+
+def bench_dumps(item_count=20000):
+    items = _make_items(item_count)
+    print(f'dumps, {item_count} items with 3 Decimals each')
+
+    _report('json.dumps, decimal_default', timeit.timeit(
+        lambda: json.dumps(items, default=decimal_default), number=1))
+    _report('dumps_bytes, json module', timeit.timeit(
+        lambda: json_utils._stdlib_dumps_bytes(items), number=1))
+
+    if json_utils.orjson is not None:
+        _report('dumps_bytes, orjson', timeit.timeit(lambda: dumps_bytes(items), number=1))
+
+    rich_items = [
+        {'id': UUID(int=i), 'updated': datetime(2020, 12, 1, 8, i % 60), 'tags': {'a', 'b'}}
+        for i in range(item_count)
+    ]
+    print(f'dumps, {item_count} items with UUIDs, datetimes and sets')
+
+    _report('dumps_bytes, json module', timeit.timeit(
+        lambda: json_utils._stdlib_dumps_bytes(rich_items), number=1))
+
+    if json_utils.orjson is not None:
+        _report('dumps_bytes, orjson', timeit.timeit(lambda: dumps_bytes(rich_items), number=1))
+
+
+def _peak_memory(func):
+    '''Return the peak memory allocated while func runs, in MB.'''
+    tracemalloc.start()
+
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+
+def _too_large_response(payload):
+    try:
+        streamed_success_response(payload, max_body_size=1024 ** 2)
+    except ResponseTooLarge:
+        pass
+
+
+def bench_streamed(item_count=30000):
+    items = _make_items(item_count)
+    payload = {'items': items, 'count': item_count}
+    print(f'streamed responses, {item_count} items')
+
+    _report('success_response', timeit.timeit(lambda: success_response(payload), number=1))
+    _report('streamed_success_response', timeit.timeit(lambda: streamed_success_response(payload), number=1))
+    _report('streamed_success_response, over 1 MB', timeit.timeit(lambda: _too_large_response(payload), number=1))
+
+    with open(os.devnull, 'w') as fp:
+        _report('json.dump to file', timeit.timeit(lambda: json.dump(payload, fp, default=decimal_default), number=1))
+
+    with open(os.devnull, 'wb') as fp:
+        _report('dump to file', timeit.timeit(lambda: dump(payload, fp), number=1))
+
+    print(f'peak memory, {item_count} items')
+    print(f'{"success_response":<45} {_peak_memory(lambda: success_response(payload)):>10.2f} MB')
+    print(f'{"streamed_success_response":<45} {_peak_memory(lambda: streamed_success_response(payload)):>10.2f} MB')
+
+    with open(os.devnull, 'w') as fp:
+        print(f'{"json.dump to file":<45} {_peak_memory(lambda: json.dump(payload, fp, default=decimal_default)):>10.2f} MB')
+
+    with open(os.devnull, 'wb') as fp:
+        print(f'{"dump to file":<45} {_peak_memory(lambda: dump(payload, fp)):>10.2f} MB')
+
+
+def _loads_then_convert(text):
+    '''json.loads, then converting money fields back to Decimal by hand, as callers did before loads.'''
+    records = json.loads(text)
+
+    for record in records:
+        record['price'] = Decimal(str(record['price']))
+        record['weight'] = Decimal(str(record['weight']))
+
+    return records
+
+
+def bench_loads(record_count=100000):
+    text = json.dumps([
+        {'id': i, 'price': round(i * 1.37, 2), 'weight': 0.125, 'ratio': i / 7, 'name': f'item {i}'}
+        for i in range(record_count)
+    ])
+    megabytes = len(text) / 1024 ** 2
+    print(f'loads, {record_count} records, {megabytes:.1f} MB')
+
+    _report('json.loads', _best_of(lambda: json.loads(text)))
+    _report('json.loads, then Decimal by hand', _best_of(lambda: _loads_then_convert(text)))
+    _report('json.loads, parse_float=Decimal', _best_of(
+        lambda: json.loads(text, parse_float=Decimal)))
+    _report('loads, float', _best_of(lambda: loads(text)))
+    _report('loads, decimal', _best_of(lambda: loads(text, numbers='decimal')))
+    _report('loads, lazy_decimal', _best_of(lambda: loads(text, numbers='lazy_decimal')))
+    _report('loads, lazy_decimal, using 1 field', _best_of(
+        lambda: [record['price'].decimal for record in loads(text, numbers='lazy_decimal')]))
+
+
+def _report_throughput(name, megabytes, seconds):
+    print(f'{name:<45} {megabytes / seconds:>10.1f} MB/s')
+
+
+def _write_lines(path, records):
+    '''Writing a json.dumps line per record, as jobs did before NdjsonWriter, kept as a baseline.'''
+    with open(path, 'w') as fp:
+        for record in records:
+            fp.write(json.dumps(record, default=decimal_default) + '\n')
+
+
+def _write_ndjson(path, records):
+    with open(path, 'wb') as fp, NdjsonWriter(fp) as writer:
+        writer.write_many(records)
+
+
+def _read_lines(path):
+    '''Reading the whole file and calling json.loads per line, as jobs did before iter_ndjson, kept as a baseline.'''
+    with open(path) as fp:
+        return [json.loads(line) for line in fp.read().splitlines() if line]
+
+
+def _consume_ndjson(path, **kwargs):
+    with open(path, 'rb') as fp:
+        deque(iter_ndjson(fp, **kwargs), maxlen=0)
+
+
+def bench_ndjson(record_count=200000):
+    records = _make_items(record_count)
+    path = os.path.join(tempfile.mkdtemp(), 'records.ndjson')
+
+    try:
+        _write_ndjson(path, records)
+        megabytes = os.path.getsize(path) / 1024 ** 2
+        print(f'ndjson, {record_count} records, {megabytes:.1f} MB')
+
+        _report_throughput('write, json.dumps per line', megabytes, _best_of(lambda: _write_lines(path, records)))
+        _report_throughput('write, NdjsonWriter', megabytes, _best_of(lambda: _write_ndjson(path, records)))
+
+        _report_throughput('read, json.loads per line', megabytes, _best_of(lambda: _read_lines(path)))
+        _report_throughput('read, iter_ndjson', megabytes, _best_of(lambda: _consume_ndjson(path)))
+        _report_throughput('read, iter_ndjson, decimal', megabytes, _best_of(
+            lambda: _consume_ndjson(path, numbers='decimal')))
+        _report_throughput('read, read_ndjson, memory mapped', megabytes, _best_of(
+            lambda: deque(read_ndjson(path), maxlen=0)))
+
+        worker_count = os.cpu_count() or 1
+
+        with ProcessPoolExecutor(worker_count) as executor:
+            _report_throughput(f'read, iter_ndjson, decimal, {worker_count} processes', megabytes, _best_of(
+                lambda: _consume_ndjson(path, numbers='decimal', executor=executor)))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    bench_dumps()
+    bench_streamed()
+    bench_loads()
+    bench_ndjson()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for jwt_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_jwt_utils.py
+'''
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+from python_utils.jwt_utils import JwkCache, JwtCache, JwtComponents, JwtVerifier, get_jwt_token_components
+
+
+def _report(name, seconds, number):
+    print(f'{name:<45} {seconds / number * 1e6:>10.2f} us per call')
+
+
+def _encode_component(component):
+    encoded = base64.urlsafe_b64encode(json.dumps(component).encode('utf-8'))
+    return encoded.decode('ascii').rstrip('=')
+
+
+def _make_token(claim_count=20):
+    header = _encode_component({'alg': 'RS256', 'typ': 'JWT', 'kid': 'key-1'})
+    payload = {f'claim_{i}': f'value {i}' for i in range(claim_count)}
+    payload['exp'] = time.time() + 3600
+    return f'Bearer {header}.{_encode_component(payload)}.{"s" * 342}'
+
+
+def bench_components(number=100000):
+    token = _make_token()
+    cache = JwtCache()
+    print('jwt components, the same token every call')
+
+    _report('get_jwt_token_components', timeit.timeit(lambda: get_jwt_token_components(token), number=number), number)
+    _report('JwtComponents, header only', timeit.timeit(lambda: JwtComponents(token)['jwt_header'], number=number), number)
+    _report('JwtCache.get', timeit.timeit(lambda: cache.get(token)['jwt_payload'], number=number), number)
+    print(f'hits: {cache.hits}, misses: {cache.misses}')
+
+
+def _hs256_token(secret, sub):
+    signing_input = '.'.join([
+        _encode_component({'alg': 'HS256', 'kid': 'hmac-1'}),
+        _encode_component({'sub': sub, 'exp': time.time() + 3600}),
+    ])
+    signature = hmac.new(secret, signing_input.encode('ascii'), hashlib.sha256).digest()
+    return f'Bearer {signing_input}.{base64.urlsafe_b64encode(signature).decode().rstrip("=")}'
+
+
+def bench_verify(token_count=2000):
+    secret = os.urandom(32)
+    keys = JwkCache({'keys': [
+        {'kty': 'oct', 'kid': 'hmac-1', 'k': base64.urlsafe_b64encode(secret).decode()},
+    ]})
+    tokens = [_hs256_token(secret, str(i)) for i in range(token_count)]
+    print(f'HS256 verification, {token_count} tokens')
+
+    _report('verify, first time', timeit.timeit(
+        lambda: JwtVerifier(keys, maxsize=token_count).verify_many(tokens), number=1), token_count)
+
+    # sized to hold every token, as scanning more tokens than maxsize in order never hits
+    verifier = JwtVerifier(keys, maxsize=token_count)
+    verifier.verify_many(tokens)
+    _report('verify, cached', timeit.timeit(lambda: verifier.verify_many(tokens), number=1), token_count)
+
+    with ThreadPoolExecutor(4) as executor:
+        _report('verify_many, 4 threads, first time', timeit.timeit(
+            lambda: JwtVerifier(keys, maxsize=token_count).verify_many(tokens, executor), number=1), token_count)
+
+    try:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding, rsa
+    except ImportError:
+        print('cryptography is not installed, skipping RS256')
+        return
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    numbers = private_key.public_key().public_numbers()
+    keys = JwkCache({'keys': [{
+        'kty': 'RSA',
+        'kid': 'rsa-1',
+        'n': base64.urlsafe_b64encode(numbers.n.to_bytes(256, 'big')).decode(),
+        'e': base64.urlsafe_b64encode(numbers.e.to_bytes(3, 'big')).decode(),
+    }]})
+    header = _encode_component({'alg': 'RS256', 'kid': 'rsa-1'})
+    signing_input = f'{header}.{_encode_component({"sub": "bob", "exp": time.time() + 3600})}'
+    signature = private_key.sign(signing_input.encode('ascii'), padding.PKCS1v15(), hashes.SHA256())
+    token = f'Bearer {signing_input}.{base64.urlsafe_b64encode(signature).decode().rstrip("=")}'
+    print('RS256 verification, one token')
+
+    _report('verify, first time', timeit.timeit(lambda: JwtVerifier(keys).verify(token), number=1000), 1000)
+    verifier = JwtVerifier(keys)
+    _report('verify, cached', timeit.timeit(lambda: verifier.verify(token), number=100000), 100000)
+
+
+if __name__ == '__main__':
+    bench_components()
+    bench_verify()
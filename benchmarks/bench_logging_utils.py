@@ -0,0 +1,149 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for logging_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_logging_utils.py
+'''
+import json
+import logging
+import time
+import timeit
+from decimal import Decimal
+
+from python_utils import logging_utils
+from python_utils.json_utils import decimal_default
+from python_utils.logging_utils import (
+    LOG_FORMAT,
+    JsonFormatter,
+    flush_logs,
+    initialize_logger,
+    lazy_evaluate_string,
+    lazy_log,
+    remove_handlers,
+)
+
+
+class SlowStream:
+    '''Stream standing in for a slow stdout, where every write stalls for write_seconds.'''
+
+    def __init__(self, write_seconds):
+        self.write_seconds = write_seconds
+
+    def write(self, text):
+        time.sleep(self.write_seconds)
+
+    def flush(self):
+        pass
+
+
+def _report_latency(name, latencies):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f'{name:<30} p50 {p50 * 1e6:>10.2f} us    p99 {p99 * 1e6:>10.2f} us')
+
+
+def _time_log_calls(call_count):
+    logger = logging.getLogger('bench')
+    latencies = []
+
+    for i in range(call_count):
+        start = time.perf_counter()
+        logger.info('request %s handled in %s ms', i, 12.5)
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def bench_log_call_latency(call_count=2000, write_seconds=0.0005):
+    print(f'log call latency, {call_count} calls, each write stalling {write_seconds * 1e3} ms')
+
+    remove_handlers()
+    initialize_logger('INFO', remove_existing_handlers=True)
+    logging.root.handlers[0].setStream(SlowStream(write_seconds))
+    _report_latency('basicConfig stream handler', _time_log_calls(call_count))
+
+    initialize_logger('INFO', remove_existing_handlers=True, use_queue=True)
+    logging_utils._QUEUE_LISTENER.handlers[0].setStream(SlowStream(write_seconds))
+    _report_latency('queue handler', _time_log_calls(call_count))
+
+    start = time.perf_counter()
+    flush_logs()
+    print(f'{"flush_logs after queue":<30} {(time.perf_counter() - start) * 1e3:>10.2f} ms')
+    remove_handlers()
+
+
+class NaiveJsonFormatter(logging.Formatter):
+    '''Json formatter as usually written, baseline for JsonFormatter.'''
+
+    def format(self, record):
+        fields = {
+            'level': record.levelname,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields.update(record.__dict__.get('extra_fields', {}))
+        return json.dumps(fields, default=decimal_default)
+
+
+def _report(name, seconds, number):
+    print(f'{name:<30} {seconds / number * 1e6:>10.2f} us per call')
+
+
+def bench_formatters(number=50000):
+    print(f'format one record, {number} calls')
+    record = logging.LogRecord('bench', logging.INFO, 'bench.py', 1, 'request %s handled in %s ms', ('abc', 12.5), None)
+    structured = logging.LogRecord('bench', logging.INFO, 'bench.py', 1, 'request handled', ({'request_id': 'abc', 'ms': Decimal('12.5')},), None)
+    structured.user = 'bob'
+
+    formatters = [
+        ('stdlib Formatter LOG_FORMAT', logging.Formatter(LOG_FORMAT), record),
+        ('naive json formatter', NaiveJsonFormatter(), record),
+        ('JsonFormatter', JsonFormatter(), record),
+        ('JsonFormatter structured', JsonFormatter(), structured),
+    ]
+
+    for name, formatter, subject in formatters:
+        _report(name, timeit.timeit(lambda: formatter.format(subject), number=number), number)
+
+
+class OldLazyString(object):
+    '''LazyString before memoizing, baseline for lazy_log.'''
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return '{0}'.format(self.func(*self.args))
+
+
+def _render_rows(rows):
+    return '\n'.join(str(row) for row in rows)
+
+
+def bench_disabled_level(number=500000):
+    print(f'debug call with debug disabled, {number} calls')
+    logger = logging.getLogger('bench.disabled')
+    logger.setLevel(logging.INFO)
+    rows = [{'id': i} for i in range(100)]
+    lazy_render_rows = lazy_evaluate_string(_render_rows)
+
+    _report('OldLazyString', timeit.timeit(
+        lambda: logger.debug('%s', OldLazyString(_render_rows, rows)), number=number), number)
+    _report('lazy_evaluate_string', timeit.timeit(
+        lambda: logger.debug('%s', lazy_render_rows(rows)), number=number), number)
+    _report('lazy_log', timeit.timeit(
+        lambda: lazy_log(logger, logging.DEBUG, '%s', _render_rows, rows), number=number), number)
+    _report('isEnabledFor inline', timeit.timeit(
+        lambda: logger.isEnabledFor(logging.DEBUG) and logger.debug('%s', _render_rows(rows)), number=number), number)
+
+
+if __name__ == '__main__':
+    bench_log_call_latency()
+    print()
+    bench_formatters()
+    print()
+    bench_disabled_level()
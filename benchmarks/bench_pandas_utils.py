@@ -0,0 +1,84 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for pandas_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_pandas_utils.py
+'''
+import timeit
+from typing import Optional, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from pandas_utils import coerce_dataframe, coerce_nan_to_none, df_to_dict, trim_dataframe, validate_dataframe
+from python_utils.dict_utils import coerce_datatypes, trim_dict_values
+from python_utils.typing_utils import verify_type
+
+
+def _report(name, seconds):
+    print(f'{name:<45} {seconds * 1e3:>10.2f} ms')
+
+
+def bench_coerce_dataframe(row_count=200000):
+    datatype_map = {
+        'project': {'conversion_function': str},
+        'index': {'conversion_function': int},
+        'amount': {'conversion_function': float},
+        'flag': {'conversion_function': bool, 'default': False},
+    }
+    df = pd.DataFrame({
+        'project': np.arange(row_count).astype(str),
+        'index': np.arange(row_count).astype(str),
+        'amount': np.random.random(row_count),
+    })
+
+    print(f'coerce DataFrame, {row_count} rows')
+    _report('df_to_dict + coerce_datatypes', timeit.timeit(
+        lambda: [coerce_datatypes(datatype_map, _) for _ in df_to_dict(df)], number=1))
+    _report('coerce_dataframe', timeit.timeit(
+        lambda: coerce_dataframe(df, datatype_map), number=1))
+
+
+def bench_trim_dataframe(row_count=200000):
+    df = pd.DataFrame({
+        'name': [f'  name {i} ' for i in range(row_count)],
+        'code': pd.Series([f' {i}' if i % 2 else i for i in range(row_count)], dtype=object),
+        'amount': np.random.random(row_count),
+        'count': np.arange(row_count),
+    })
+
+    print(f'trim DataFrame, {row_count} rows')
+    _report('df_to_dict + trim_dict_values', timeit.timeit(
+        lambda: [trim_dict_values(_) for _ in df_to_dict(df)], number=1))
+    _report('trim_dataframe', timeit.timeit(lambda: trim_dataframe(df), number=1))
+
+
+class SheetRow(TypedDict):
+    name: str
+    count: int
+    amount: float
+    note: Optional[str]
+
+
+def bench_validate_dataframe(row_count=500000):
+    df = pd.DataFrame({
+        'name': pd.Series([f'name {i}' for i in range(row_count)], dtype=object),
+        'count': np.arange(row_count),
+        'amount': np.random.random(row_count),
+        'note': pd.Series([None if i % 3 else 'note' for i in range(row_count)], dtype=object),
+    })
+
+    def verify_rows():
+        for row in df_to_dict(coerce_nan_to_none(df)):
+            verify_type(row, SheetRow)
+
+    print(f'validate DataFrame, {row_count} rows')
+    _report('df_to_dict + verify_type', timeit.timeit(verify_rows, number=1))
+    _report('validate_dataframe', timeit.timeit(lambda: validate_dataframe(df, SheetRow), number=1))
+
+
+if __name__ == '__main__':
+    bench_coerce_dataframe()
+    bench_trim_dataframe()
+    bench_validate_dataframe()
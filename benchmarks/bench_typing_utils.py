@@ -0,0 +1,144 @@
+#!/usr/bin/env python3.8
+'''
+Benchmarks for typing_utils.
+
+Run from the repo root with:
+    PYTHONPATH=src python benchmarks/bench_typing_utils.py
+'''
+import timeit
+
+import numpy as np
+from typing import Dict, List, Optional, TypedDict, Union
+
+from python_utils.typing_utils import (
+    compile_validator,
+    filter_valid,
+    validate_batch,
+    verify_homogeneous_list,
+    verify_type,
+)
+
+
+class Item(TypedDict):
+    sku: str
+    price: float
+    quantity: int
+    tags: List[str]
+    note: Optional[str]
+
+
+class Order(TypedDict):
+    order_id: str
+    items: List[Item]
+    attributes: Dict[str, Union[str, int]]
+
+
+class RequestBody(TypedDict):
+    orders: List[Order]
+
+
+def _request_body(order_count, items_per_order):
+    return {
+        'orders': [
+            {
+                'order_id': f'order_{i}',
+                'items': [
+                    {'sku': f'sku_{j}', 'price': 1.5, 'quantity': j, 'tags': ['a', 'b'], 'note': None}
+                    for j in range(items_per_order)
+                ],
+                'attributes': {'source': 'web', 'priority': 1},
+            }
+            for i in range(order_count)
+        ],
+    }
+
+
+def _report(name, seconds):
+    print(f'{name:<45} {seconds * 1e3:>10.2f} ms')
+
+
+def bench_verify_type(order_count=500, items_per_order=10):
+    body = _request_body(order_count, items_per_order)
+    validate = compile_validator(RequestBody)
+
+    print(f'verify nested List[TypedDict], {order_count * items_per_order} items')
+    _report('verify_type', min(timeit.repeat(lambda: verify_type(body, RequestBody, 'body'), number=1, repeat=5)))
+    _report('compile_validator (prebuilt)', min(timeit.repeat(lambda: validate(body, 'body'), number=1, repeat=5)))
+
+
+def _filter_with_verify_type(subjects, expected_type):
+    valid = []
+    for subject in subjects:
+        try:
+            verify_type(subject, expected_type)
+        except (TypeError, KeyError):
+            continue
+        valid.append(subject)
+    return valid
+
+
+def bench_filter_valid(subject_count=20000):
+    item = _request_body(1, 1)['orders'][0]['items'][0]
+    subjects = [item, {**item, 'price': 'free'}, 'not an item', None] * (subject_count // 4)
+    expected_type = Union[Item, List[int]]
+
+    print(f'filter {subject_count} mixed subjects, 1 in 4 valid')
+    _report('try/except verify_type', min(timeit.repeat(
+        lambda: _filter_with_verify_type(subjects, expected_type), number=1, repeat=5)))
+    _report('filter_valid', min(timeit.repeat(
+        lambda: list(filter_valid(subjects, expected_type)), number=1, repeat=5)))
+
+
+def bench_validate_batch(record_count=20000, bad_record_count=20):
+    item = _request_body(1, 1)['orders'][0]['items'][0]
+    records = [dict(item) for _ in range(record_count)]
+    step = record_count // bad_record_count
+    for index in range(0, record_count, step):
+        records[index]['price'] = 'free'
+
+    def fix_one_error_per_round_trip():
+        # what a client goes through when only the first error is reported
+        fixed = [dict(_) for _ in records]
+        while True:
+            try:
+                for index, record in enumerate(fixed):
+                    verify_type(record, Item)
+                return
+            except TypeError:
+                fixed[index]['price'] = 1.0
+
+    print(f'validate {record_count} records with {bad_record_count} bad records')
+    _report('verify_type, one error per round trip', timeit.timeit(fix_one_error_per_round_trip, number=1))
+    _report('validate_batch, all errors', timeit.timeit(lambda: validate_batch(records, Item, None), number=1))
+    _report('validate_batch, max_errors=5', timeit.timeit(lambda: validate_batch(records, Item, 5), number=1))
+
+
+def _verify_list_per_element(subject, element_type, label):
+    '''Original per element recursion verify_type used for List[element_type], kept as a baseline.'''
+    for el in subject:
+        verify_type(el, element_type, f'item in {label}')
+
+
+def bench_primitive_lists(element_count=1000000):
+    print(f'verify primitive lists, {element_count} elements')
+    for element_type, subject in (
+            (int, list(range(element_count))),
+            (float, [_ * 0.5 for _ in range(element_count)]),
+            (str, [str(_) for _ in range(element_count)]),
+        ):
+        name = element_type.__name__
+        _report(f'per element verify_type, List[{name}]', timeit.timeit(
+            lambda: _verify_list_per_element(subject, element_type, 'body'), number=1))
+        _report(f'verify_type, List[{name}]', timeit.timeit(
+            lambda: verify_type(subject, List[element_type], 'body'), number=1))
+
+    array = np.arange(element_count)
+    _report('verify_homogeneous_list, int64 ndarray', timeit.timeit(
+        lambda: verify_homogeneous_list(array, int, 'body'), number=1))
+
+
+if __name__ == '__main__':
+    bench_verify_type()
+    bench_filter_valid()
+    bench_validate_batch()
+    bench_primitive_lists()
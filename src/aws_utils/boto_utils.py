@@ -2,10 +2,15 @@
 '''
 Utils to help writing and reading from the db.
 '''
+import json
 import logging
-from typing import Dict, List, TypedDict, Protocol
+import math
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypedDict, Protocol
 
-from python_utils.logging_utils import lazy_evaluate_string
+from python_utils.iterable_utils import batched
+from python_utils.logging_utils import lazy_evaluate_string, lazy_log
 
 logger = logging.getLogger(__file__)
 
@@ -68,6 +73,84 @@ def convert_to_parameter(key: str, val) -> BotoParameter:
     }
 
 
+def estimate_parameter_set_size(parameter_set: BotoParameterSet) -> int:
+    '''Return the number of bytes parameter_set takes up in the json body of a request.
+
+    This is the length of json.dumps(parameter_set), as boto encodes it,
+    worked out without building the json string.
+
+    >>> estimate_parameter_set_size([{'name': 'number', 'value': {'longValue': 2}}])
+    47
+    '''
+    if not parameter_set:
+        return 2
+
+    # "[" and "]", plus ", " between parameters
+    size = 2 * len(parameter_set)
+
+    for param in parameter_set:
+        value = param['value']
+        # {"name": <name>, "value": {<fields>}}, where each field is
+        # <data_type>: <val> with ", " between fields
+        size += 21 + _get_key_length(param['name']) + 4 * len(value)
+
+        for data_type, val in value.items():
+            size += _get_key_length(data_type) + _JSON_LENGTHS.get(type(val), _get_dumps_length)(val)
+
+    return size
+
+
+def batch_parameter_sets(
+        parameter_sets: Iterable[BotoParameterSet],
+        max_sets: int,
+        max_bytes: Optional[int] = None,
+    ) -> Iterator[List[BotoParameterSet]]:
+    '''Lazily yield lists of parameter sets to pass to BatchExecuteStatement, as full as the limits allow.
+
+    Each list has at most max_sets parameter sets. If max_bytes is set,
+    the parameterSets json in each request is at most max_bytes long.
+    max_bytes should leave room for the sql and the rest of the request body.
+
+    Raise ValueError if a single parameter set is larger than max_bytes.'''
+    # the 2 bytes of "[]" around the list are counted as the ", " before the first set
+    return batched(parameter_sets, max_sets, max_bytes, _get_batched_parameter_set_size)
+
+
+def _get_batched_parameter_set_size(parameter_set: BotoParameterSet) -> int:
+    '''Return size of parameter_set in a parameterSets list, including the ", " separating it.'''
+    return estimate_parameter_set_size(parameter_set) + 2
+
+
+def _get_float_length(val: float) -> int:
+    '''Return length of float in json, which is its repr unless it is nan or infinite.'''
+    if math.isfinite(val):
+        return len(float.__repr__(val))
+
+    return len(json.dumps(val))
+
+
+# lengths of boto parameter values in json, by type
+# bool is checked by exact type, as it is a subclass of int
+_JSON_LENGTHS: Dict[type, Callable[[object], int]] = {
+    str: lambda val: len(encode_basestring_ascii(val)),
+    bool: lambda val: 4 if val else 5,
+    int: lambda val: len(int.__repr__(val)),
+    float: _get_float_length,
+    type(None): lambda val: 4,
+}
+
+
+def _get_dumps_length(val) -> int:
+    '''Return length of val encoded by json.dumps, for values of types not in _JSON_LENGTHS.'''
+    return len(json.dumps(val))
+
+
+@lru_cache(maxsize=1024)
+def _get_key_length(key: str) -> int:
+    '''Return length of a parameter name or data type in json, which repeat across parameter sets.'''
+    return len(encode_basestring_ascii(key))
+
+
 @lazy_evaluate_string
 def lazy_log_sql_statements(sql: str, parameterSets: List[BotoParameterSet]) -> str:
     '''Interpolate and concatenate parameters into sql in a lazy fashion.
@@ -77,6 +160,13 @@ def lazy_log_sql_statements(sql: str, parameterSets: List[BotoParameterSet]) ->
     return '\n'.join(sql_stmnts)
 
 
+def log_sql_statements(sql: str, parameterSets: List[BotoParameterSet], level: int = logging.DEBUG):
+    '''Log the sql statements with parameters interpolated, at level.
+
+    Checks the level before anything is built, so a disabled level costs one call per db call.'''
+    lazy_log(logger, level, '%s', lazy_log_sql_statements.__wrapped__, sql, parameterSets)
+
+
 def interpolate_batch_sql(sql: str, parameterSets: List[BotoParameterSet]) -> List[str]:
     '''Output sql statements for batch_execute_statement function.'''
     return [interpolate_sql_statement(sql, _) for _ in parameterSets]
@@ -44,3 +44,7 @@ class BadRequest(ServerError):
 class InternalServerError(ServerError):
     '''Generic exception for internal errors while processing requests.'''
     error_status = HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+class ResponseTooLarge(InternalServerError):
+    '''Exception for responses with a body too large for lambda to return.'''
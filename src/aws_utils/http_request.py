@@ -3,6 +3,7 @@ import json
 from typing import Optional, TypedDict
 
 from aws_utils.http_exceptions import BadRequest
+from python_utils.json_utils import loads
 
 
 class PostRequest(TypedDict):
@@ -15,9 +16,12 @@ class GetRequest(TypedDict):
     pathParameters: Optional[dict]
 
 
-def get_body_from_post_request(event: PostRequest):
+def get_body_from_post_request(event: PostRequest, numbers: str = 'float'):
     '''Get body from post request, and unmarshal the json value.
 
+    numbers sets how numbers with a fraction are read, as floats, Decimals or LazyDecimals.
+    See json_utils.loads.
+
     Raise BadRequest if something is wrong.'''
     body_str: Optional[str] = event.get('body')
 
@@ -25,7 +29,7 @@ def get_body_from_post_request(event: PostRequest):
         raise BadRequest('Missing request body')
 
     try:
-        body = json.loads(body_str)
+        body = loads(body_str, numbers)
     except json.decoder.JSONDecodeError:
         raise BadRequest('Malformed json in request body')
 
@@ -1,12 +1,27 @@
 '''Useful utility functions for dealing with pandas dataframes.'''
 import io
 import logging
+from datetime import date, datetime
 from functools import partial
-from typing import Set
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Type, Union, get_args, get_origin
 
 import numpy as np
 import pandas as pd
+from pandas.api.types import (
+    infer_dtype,
+    is_bool_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_numeric_dtype,
+    is_object_dtype,
+    is_string_dtype,
+    is_unsigned_integer_dtype,
+)
 from pandas.core.frame import DataFrame
+from pandas.core.series import Series
+
+from python_utils.dict_utils import DataConverterMap, trim_values
+from python_utils.typing_utils import get_typed_dict_schema, is_instance_of, is_typed_dict
 
 LOGGER = logging.getLogger(__file__)
 
@@ -74,12 +89,119 @@ def validate_required_sheet_fields(
         raise InvalidSpreadSheet(f'Uploaded sheet is missing the following required columns: {missing_columns}')
 
 
+def validate_dataframe(df: DataFrame, typed_dict: Type) -> Dict[Any, list]:
+    '''Return the index of every row with a value of the wrong type, by column.
+
+    Each column is checked against its type in typed_dict. Optional types allow nulls,
+    and other types do not. Columns are checked by dtype, and only object columns
+    (or types like List[int] that a dtype cannot describe) are checked element by element.
+    Integer columns are valid floats, and float columns of whole numbers are valid ints,
+    since pandas stores integer columns with nulls as floats.
+
+    Columns without any bad rows are left out of the result.
+    Raise InvalidSpreadSheet if any required columns are missing.
+    '''
+    schema = get_typed_dict_schema(typed_dict)
+    validate_required_sheet_fields(df, set(schema.required_keys))
+
+    bad_rows = {}
+
+    for key in schema.keys:
+        if key not in df.columns:
+            continue
+
+        invalid = _get_invalid_rows(df[key], schema.type_hints[key])
+
+        if invalid.any():
+            bad_rows[key] = list(df.index[invalid])
+
+    return bad_rows
+
+
+def _get_invalid_rows(column: Series, expected_type) -> np.ndarray:
+    '''Return a mask of the values in column that are not of expected_type.'''
+    possible_types = get_args(expected_type) if get_origin(expected_type) == Union else (expected_type,)
+    nullable = type(None) in possible_types
+    possible_types = tuple(_ for _ in possible_types if _ is not type(None))
+
+    missing = column.isna().to_numpy()
+
+    # TypedDicts are classes, but do not support isinstance, so they are checked element by element
+    if all(isinstance(_, type) and not is_typed_dict(_) for _ in possible_types):
+        if is_object_dtype(column.dtype):
+            valid = _get_valid_by_element_type(column, possible_types)
+        else:
+            valid = np.zeros(len(column), dtype=bool)
+            for possible_type in possible_types:
+                valid |= _get_valid_by_dtype(column, possible_type)
+    else:
+        non_null_type = Union[possible_types] if len(possible_types) > 1 else possible_types[0]
+        valid = column.map(partial(is_instance_of, expected_type=non_null_type)).to_numpy(dtype=bool)
+
+    return (~valid & ~missing) | (missing & (not nullable))
+
+
+def _get_valid_by_element_type(column: Series, possible_types: tuple) -> np.ndarray:
+    '''Return a mask of the values in an object column that are instances of possible_types.
+
+    Only the distinct types found in the column are compared with possible_types.'''
+    element_types = column.map(type)
+    valid_types = [_ for _ in element_types.unique() if issubclass(_, possible_types)]
+    return element_types.isin(valid_types).to_numpy()
+
+
+def _get_valid_by_dtype(column: Series, expected_type: type) -> np.ndarray:
+    '''Return a mask of the values in a non object column that are valid for expected_type.'''
+    kind = column.dtype.kind
+    all_valid = np.ones(len(column), dtype=bool)
+    none_valid = np.zeros(len(column), dtype=bool)
+
+    if expected_type is int and kind == 'f':
+        values = column.to_numpy(dtype='float64')
+        with np.errstate(invalid='ignore'):
+            return np.isfinite(values) & (values == np.floor(values))
+
+    if expected_type is str:
+        return all_valid if is_string_dtype(column.dtype) else none_valid
+
+    valid_kinds = _DTYPE_KINDS_BY_TYPE.get(expected_type, '')
+    return all_valid if kind and kind in valid_kinds else none_valid
+
+
+# numpy dtype kinds that hold valid values for each type
+_DTYPE_KINDS_BY_TYPE = {
+    bool: 'b',
+    int: 'iub',
+    float: 'fiu',
+    datetime: 'M',
+}
+
+
 def convert_date_col_to_str(df: DataFrame, column_name: str) -> DataFrame:
     df[column_name] = pd.to_datetime(df[column_name], errors='coerce')
     df[column_name] = df[column_name].astype(str)
     return df
 
 
+def trim_dataframe(df: DataFrame) -> DataFrame:
+    '''Return a copy of df with leading and trailing whitespace trimmed from all strings.
+
+    Only object and string columns are trimmed. Columns of only strings use the
+    vectorized .str.strip(), and columns of mixed values use dict_utils.trim_values on each cell.'''
+    trimmed = df.copy(deep=False)
+
+    for position, (_, column) in enumerate(df.items()):
+        if is_string_dtype(column.dtype) and not is_object_dtype(column.dtype):
+            trimmed.isetitem(position, column.str.strip())
+        elif is_object_dtype(column.dtype):
+            if infer_dtype(column, skipna=True) == 'string':
+                trimmed.isetitem(position, column.str.strip())
+            else:
+                trimmed.isetitem(position, column.map(trim_values))
+
+    return trimmed
+
+
 def df_to_dict(df: DataFrame) -> dict:
     return df.to_dict('records')
 
@@ -94,3 +216,197 @@ def transform_db_response_cell(cell):
 
 def db_response_to_df(df):
     return df.apply(transform_db_response_cell)
+
+
+def coerce_dataframe(df: DataFrame, datatype_map: DataConverterMap) -> DataFrame:
+    '''Coerce the columns of df to the datatypes in datatype_map.
+
+    This is the columnar equivalent of calling dict_utils.coerce_datatypes on every row.
+    Columns not in datatype_map are dropped, and missing columns are filled with their converted 'default'.
+
+    Known conversion functions (int, float, str, bool, date.fromisoformat, datetime.fromisoformat)
+    are applied as vectorized casts. Any value a vectorized cast cannot handle, and every value
+    of a column with any other conversion function, is converted with the conversion function itself.
+
+    Raise KeyError(e, column) if a column without a 'default' is missing.
+    Raise ValueError(e, (column, row_indices)) with the index of every row in the
+    first column that cannot be coerced, and the first exception found as e.
+    '''
+    coerced = {}
+
+    for key, val in datatype_map.items():
+        conversion_func = val['conversion_function']
+
+        if key in df.columns:
+            coerced[key] = _coerce_series(key, df[key], conversion_func)
+            continue
+
+        if 'default' not in val:
+            e = KeyError(key)
+            raise KeyError(e, key) from e
+
+        # every row gets the same default, so only convert it once
+        try:
+            default = conversion_func(val['default'])
+        except (ValueError, TypeError) as e:
+            raise ValueError(e, (key, list(df.index))) from e
+
+        coerced[key] = pd.Series([default] * len(df.index), index=df.index)
+
+    return pd.DataFrame(coerced, index=df.index)
+
+
+def _coerce_series(key, column: Series, conversion_func: Callable) -> Series:
+    '''Coerce a column with a vectorized cast if one is known, falling back to conversion_func.'''
+    vectorized_cast = VECTORIZED_CASTS.get(conversion_func)
+    cast = vectorized_cast(column) if vectorized_cast else None
+
+    if cast is None:
+        values = np.empty(len(column), dtype=object)
+        fallback = np.ones(len(column), dtype=bool)
+    else:
+        result, fallback = cast
+
+        if not fallback.any():
+            return result
+
+        values = result.to_numpy(dtype=object)
+
+    errors = []
+    first_exception = None
+    positions = np.flatnonzero(fallback)
+    original_values = column.to_numpy(dtype=object)
+
+    for position in positions:
+        try:
+            values[position] = conversion_func(original_values[position])
+        except (ValueError, TypeError) as e:
+            if first_exception is None:
+                first_exception = e
+            errors.append(column.index[position])
+
+    if first_exception is not None:
+        raise ValueError(first_exception, (key, errors)) from first_exception
+
+    return pd.Series(values, index=column.index).infer_objects()
+
+
+# A vectorized cast returns the cast column, and a mask of values that must be
+# converted by the conversion function instead, or None if it cannot handle the column.
+VectorizedCast = Callable[[Series], Optional[Tuple[Series, np.ndarray]]]
+
+# ascii only, as to_numeric does not parse the other digits and whitespace that int() accepts
+_INT_STRING_RE = r'[ \t\n\r\f\v]*[-+]?[0-9]+[ \t\n\r\f\v]*'
+_ISO_DATE_RE = r'\d{4}-\d{2}-\d{2}'
+_ISO_DATETIME_RE = r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?'
+
+
+# floats that int64 can hold are in [-2 ** 63, 2 ** 63), both bounds being exact floats
+_INT64_LOWER_BOUND = -2.0 ** 63
+_INT64_UPPER_BOUND = 2.0 ** 63
+
+
+def _is_string_series(column: Series) -> bool:
+    '''Return True if every value in column is a str or missing.'''
+    return infer_dtype(column, skipna=True) == 'string'
+
+
+def _cast_int(column: Series):
+    '''Vectorized int() for bool, integer, float and integer string columns.
+
+    Values outside the int64 range are left to int(), which is exact for any size.'''
+    if is_unsigned_integer_dtype(column):
+        return _cast_unsigned_int(column, np.zeros(len(column), dtype=bool))
+
+    if is_bool_dtype(column) or is_integer_dtype(column):
+        return column.astype('int64'), np.zeros(len(column), dtype=bool)
+
+    if is_float_dtype(column):
+        values = column.to_numpy(dtype='float64')
+        # NaN fails both comparisons, so it falls back with infinities and out of range values
+        with np.errstate(invalid='ignore'):
+            fallback = ~((values >= _INT64_LOWER_BOUND) & (values < _INT64_UPPER_BOUND))
+        return column.where(~fallback, 0).astype('int64'), fallback
+
+    if _is_string_series(column):
+        fallback = ~column.str.fullmatch(_INT_STRING_RE).fillna(False).to_numpy(dtype=bool)
+        numbers = pd.to_numeric(column.where(~fallback, '0'))
+        if is_unsigned_integer_dtype(numbers):
+            return _cast_unsigned_int(numbers, fallback)
+        if is_integer_dtype(numbers):
+            return numbers.astype('int64'), fallback
+
+    return None
+
+
+def _cast_unsigned_int(column: Series, fallback: np.ndarray):
+    '''Cast an unsigned integer column to int64, leaving values over the int64 maximum to fallback.'''
+    fallback = fallback | (column.to_numpy() > np.iinfo('int64').max)
+    return column.where(~fallback, 0).astype('int64'), fallback
+
+
+def _cast_float(column: Series):
+    '''Vectorized float() for numeric and numeric string columns.'''
+    if is_numeric_dtype(column):
+        return column.astype('float64'), np.zeros(len(column), dtype=bool)
+
+    if _is_string_series(column):
+        # astype calls float(), which rounds correctly where to_numeric can be 1 ulp off,
+        # so to_numeric only picks out the values to leave to float() when astype fails
+        fallback = column.isna().to_numpy()
+        try:
+            return column.where(~fallback, '0').astype('float64'), fallback
+        except (ValueError, TypeError):
+            pass
+
+        fallback = fallback | pd.to_numeric(column, errors='coerce').isna().to_numpy()
+        try:
+            return column.where(~fallback, '0').astype('float64'), fallback
+        except (ValueError, TypeError):
+            return None
+
+    return None
+
+
+def _cast_str(column: Series):
+    '''Vectorized str() for any column.'''
+    # numpy calls str() on every value, so NaN and None become 'nan' and 'None' like str() does
+    strings = column.to_numpy(dtype=object).astype(str).astype(object)
+    return pd.Series(strings, index=column.index, dtype=object), np.zeros(len(column), dtype=bool)
+
+
+def _cast_bool(column: Series):
+    '''Vectorized bool() for bool and numeric columns.'''
+    if is_bool_dtype(column):
+        return column.astype(bool), np.zeros(len(column), dtype=bool)
+
+    if is_numeric_dtype(column):
+        # NaN != 0, matching bool(float('nan'))
+        return column.ne(0), np.zeros(len(column), dtype=bool)
+
+    return None
+
+
+def _iso_cast(pattern: str, date_format: str, to_date: bool) -> VectorizedCast:
+    '''Return a vectorized cast for strings that strictly match an ISO 8601 pattern.'''
+    def cast(column: Series):
+        if not _is_string_series(column):
+            return None
+
+        matched = column.str.fullmatch(pattern).fillna(False).to_numpy(dtype=bool)
+        parsed = pd.to_datetime(column.where(matched), format=date_format, errors='coerce')
+        fallback = parsed.isna().to_numpy()
+
+        return (parsed.dt.date if to_date else parsed), fallback
+
+    return cast
+
+
+VECTORIZED_CASTS: Dict[Callable, VectorizedCast] = {
+    int: _cast_int,
+    float: _cast_float,
+    str: _cast_str,
+    bool: _cast_bool,
+    date.fromisoformat: _iso_cast(_ISO_DATE_RE, '%Y-%m-%d', to_date=True),
+    datetime.fromisoformat: _iso_cast(_ISO_DATETIME_RE, 'ISO8601', to_date=False),
+}
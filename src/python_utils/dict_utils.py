@@ -2,40 +2,93 @@
 '''
 This module contains functions for working with dicts.
 '''
-from functools import partial, reduce
-from typing import ABCMeta, Any, Callable, Dict, TypedDict
+from collections import abc
+from types import MappingProxyType
+from typing import (
+    ABCMeta,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+)
+
+from python_utils.typing_utils import get_typed_dict_schema
 
 
 def dict_with_required_keys(content: dict, required_keys: tuple) -> dict:
     '''Return a new dict that contains the key/values from content that are in required_keys.
 
     If any required_keys are not in content, raise KeyError.'''
-    reducer = partial(_extract_key_val_pair_to_dict, content=content)
-    return reduce(reducer, required_keys, {})
+    return KeyProjector(required_keys)(content)
 
 
-def _extract_key_val_pair_to_dict(accum, key, content):
-    '''Add key/value pair from content to accum if it exists, else raise KeyError.'''
-    val = content.get(key)
+class KeyProjector:
+    '''Project dicts onto a fixed tuple of required keys.
 
-    if val is None:
-        raise KeyError(key)
+    Build once from required_keys, then call with each record.
+    A key counts as missing if it is absent or its value is None.
 
-    return {
-        **accum,
-        key: val,
-    }
+    >>> project = KeyProjector(('a', 'b'))
+    >>> project({'a': 1, 'b': 2, 'c': 3})
+    {'a': 1, 'b': 2}
+    >>> project.project_many([{'a': 1, 'b': 2}, {'c': 3}])
+    ([{'a': 1, 'b': 2}], {1: ('a', 'b')})
+    '''
+
+    def __init__(self, required_keys: Iterable):
+        self.required_keys = tuple(required_keys)
+
+    def __call__(self, content: dict) -> dict:
+        '''Return the projection of content, or raise KeyError on the first missing key.'''
+        projected = {}
+
+        for key in self.required_keys:
+            val = content.get(key)
+
+            if val is None:
+                raise KeyError(key)
+
+            projected[key] = val
+
+        return projected
+
+    def missing_keys(self, content: dict) -> Tuple:
+        '''Return every required key that is missing from content.'''
+        return tuple(key for key in self.required_keys if content.get(key) is None)
+
+    def project_many(self, records: Iterable[dict]) -> Tuple[List[dict], Dict[int, Tuple]]:
+        '''Project every record in records.
+
+        Return a list of the projected records that had all required keys,
+        and a dict mapping the index of each incomplete record to all of its missing keys.'''
+        projected = []
+        missing = {}
+
+        for index, content in enumerate(records):
+            try:
+                projected.append(self(content))
+            except KeyError:
+                missing[index] = self.missing_keys(content)
+
+        return projected, missing
 
 
 def get_keys_from_typed_dict(typed_dict: ABCMeta) -> tuple:
-    '''Return a tuple of all keys in a TypedDict.
+    '''Return a tuple of all keys in a TypedDict, including inherited keys.
 
     >>> class TestType(TypedDict):
     ...     field: float
     >>> get_keys_from_typed_dict(TestType)
     ('field',)
     '''
-    return tuple(typed_dict.__dict__['__annotations__'].keys())
+    return get_typed_dict_schema(typed_dict).keys
 
 
 def trim_dict_values(untrimmed: dict) -> dict:
@@ -54,34 +107,301 @@ def trim_dict_values(untrimmed: dict) -> dict:
     return output
 
 
+def trim_records(records: Iterable[dict], recursive: bool = False) -> List[dict]:
+    '''Trim all string values in a list or iterator of dicts.
+
+    If recursive is True, also trim strings nested inside each record.'''
+    trim = trim_values if recursive else trim_dict_values
+    return [trim(_) for _ in records]
+
+
+def trim_values(item):
+    '''Recursively trim all strings in item of leading and trailing whitespace.
+
+    Mappings are returned as dicts, lists as lists, and tuples as tuples.
+
+    >>> trim_values({'key': [' val ', (' other ', 2)]})
+    {'key': ['val', ('other', 2)]}
+    '''
+    return _get_trimmer(type(item))(item)
+
+
 def _trim_if_string(subject):
     '''If subject is string, trim leading and trailing space.'''
-    try:
+    if type(subject) is str or isinstance(subject, (str, bytes)):
         return subject.strip()
-    except AttributeError:
-        return subject
+
+    return subject
+
+
+def _trim_mapping(subject: Mapping) -> dict:
+    return {k: _get_trimmer(type(v))(v) for k, v in subject.items()}
+
+
+def _trim_list(subject: list) -> list:
+    return [_get_trimmer(type(el))(el) for el in subject]
+
+
+def _trim_tuple(subject: tuple) -> tuple:
+    return tuple(_get_trimmer(type(el))(el) for el in subject)
+
+
+def _identity(subject):
+    return subject
 
 
-def replace_keys(item, new_key_mapping):
-    '''Recursively look through item, and replace any keys found in new_key_mapping.
+# Cache of the function trim_values uses for each type
+_TRIMMERS: Dict[type, Callable[[Any], Any]] = {
+    str: str.strip,
+    bytes: bytes.strip,
+    dict: _trim_mapping,
+    list: _trim_list,
+    tuple: _trim_tuple,
+    int: _identity,
+    float: _identity,
+    bool: _identity,
+    type(None): _identity,
+}
 
-    >>> item = [{"badKey":"value"}]
-    >>> new_key_mapping = {"badKey":"good_key"}]
+
+def _get_trimmer(subject_type: type) -> Callable[[Any], Any]:
+    '''Return the function that trims values of subject_type.'''
+    trimmer = _TRIMMERS.get(subject_type)
+
+    if trimmer is None:
+        if issubclass(subject_type, (str, bytes)):
+            trimmer = _trim_if_string
+        elif issubclass(subject_type, abc.Mapping):
+            trimmer = _trim_mapping
+        elif issubclass(subject_type, list):
+            trimmer = _trim_list
+        elif issubclass(subject_type, tuple):
+            trimmer = _trim_tuple
+        else:
+            trimmer = _identity
+
+        _TRIMMERS[subject_type] = trimmer
+
+    return trimmer
+
+
+def replace_keys(item, new_key_mapping: Mapping, in_place: bool = False):
+    '''Look through item, and replace any keys found in new_key_mapping.
+
+    Nested Mappings, lists and tuples are walked recursively, and past _MAX_RECURSION_DEPTH
+    with an explicit stack, so deeply nested items do not hit the recursion limit.
+    Subtrees without any keys to replace are returned by reference, not copied.
+    Changed Mappings are returned as dicts, changed lists as lists, and changed tuples as tuples,
+    so subclasses like namedtuples are not kept.
+
+    If in_place is True, dicts and lists (and other mutable containers) are modified
+    in place, keeping their type. Immutable containers with changes are still rebuilt.
+
+    >>> item = [{"badKey": "value"}, ("untouched",)]
+    >>> new_key_mapping = {"badKey": "good_key"}
     >>> replace_keys(item, new_key_mapping)
-    [{"good_key": "value"}]
+    [{'good_key': 'value'}, ('untouched',)]
     '''
-    if isinstance(item, dict):
-        new = {
-            new_key_mapping.get(key, key): replace_keys(val, new_key_mapping)
-            for key, val in item.items()
-        }
+    kind = _container_kind(item)
+
+    if kind is _LEAF:
+        return item
+
+    # ids of dicts with keys already renamed in place, so shared dicts are only renamed once
+    renamed_in_place: Set[int] = set()
+    kinds = _CONTAINER_KINDS
+    leaf = _LEAF
+    get_key = new_key_mapping.get
+
+    def replace(node, kind: str, depth: int):
+        '''Return node with keys replaced, walking its children with recursion.'''
+        if depth >= _MAX_RECURSION_DEPTH:
+            return _replace_keys_iterative(node, kind, new_key_mapping, in_place, renamed_in_place)
+
+        depth += 1
+
+        if kind is _MAPPING:
+            if not node.keys().isdisjoint(new_key_mapping):
+                # every key is set again anyway, so set them while walking the children
+                if in_place and isinstance(node, abc.MutableMapping):
+                    items = list(node.items())
+                    node.clear()
+                    renamed_in_place.add(id(node))
+                    new_node = node
+                else:
+                    items = node.items()
+                    new_node = {}
+
+                for key, child in items:
+                    child_kind = kinds.get(type(child)) or _container_kind(child)
+
+                    if child_kind is not leaf and not (in_place and id(child) in renamed_in_place):
+                        child = replace(child, child_kind, depth)
+
+                    new_node[get_key(key, key)] = child
+
+                return new_node
+
+            children = node.items()
+        else:
+            children = enumerate(node)
+
+        replaced = None
+
+        for position, child in children:
+            child_kind = kinds.get(type(child)) or _container_kind(child)
+
+            if child_kind is not leaf and not (in_place and id(child) in renamed_in_place):
+                new_child = replace(child, child_kind, depth)
+
+                if new_child is not child:
+                    if replaced is None:
+                        replaced = []
+                    replaced.append((position, new_child))
+
+        if replaced is None:
+            return node
+
+        return _replace_node(node, kind, new_key_mapping, replaced, in_place, renamed_in_place)
+
+    return replace(item, kind, 0)
+
+
+# Nesting depth walked with recursion, which is faster, before switching to an explicit stack
+_MAX_RECURSION_DEPTH = 200
+
 
-        return new
+def _replace_keys_iterative(
+        item,
+        kind: str,
+        new_key_mapping: Mapping,
+        in_place: bool,
+        renamed_in_place: Set[int],
+    ):
+    '''Return item with keys replaced, walking its children with an explicit stack.'''
+    kinds = _CONTAINER_KINDS
 
-    if isinstance(item, list):
-        return [replace_keys(el, new_key_mapping) for el in item]
+    # Each frame is (container, kind, iterator over its children, replaced children, position in parent)
+    stack = [(item, kind, _iter_children(item, kind), [], None)]
 
-    return item
+    while True:
+        node, kind, children, replaced, position_in_parent = stack[-1]
+
+        for position, child in children:
+            child_kind = kinds.get(type(child))
+
+            if child_kind is None:
+                child_kind = _container_kind(child)
+
+            if child_kind is not _LEAF and id(child) not in renamed_in_place:
+                stack.append((child, child_kind, _iter_children(child, child_kind), [], position))
+                break
+        else:
+            stack.pop()
+            new_node = _replace_node(node, kind, new_key_mapping, replaced, in_place, renamed_in_place)
+
+            if not stack:
+                return new_node
+
+            if new_node is not node:
+                stack[-1][3].append((position_in_parent, new_node))
+
+
+def _replace_node(
+        node,
+        kind: str,
+        new_key_mapping: Mapping,
+        replaced: list,
+        in_place: bool,
+        renamed_in_place: Set[int],
+    ):
+    '''Return node with its keys and replaced children swapped in, once its children are walked.'''
+    if kind is not _MAPPING:
+        return _replace_sequence_items(node, replaced, in_place)
+
+    has_renames = not node.keys().isdisjoint(new_key_mapping)
+    new_node = _replace_mapping_keys(node, new_key_mapping, replaced, has_renames, in_place)
+
+    if has_renames and new_node is node:
+        renamed_in_place.add(id(node))
+
+    return new_node
+
+
+# Kinds of values replace_keys walks through, and a cache of the kind of each type
+_LEAF = 'leaf'
+_MAPPING = 'mapping'
+_SEQUENCE = 'sequence'
+_CONTAINER_KINDS: Dict[type, str] = {
+    dict: _MAPPING,
+    list: _SEQUENCE,
+    tuple: _SEQUENCE,
+}
+
+
+def _container_kind(subject) -> str:
+    '''Return whether subject is a Mapping, a list or tuple, or a leaf value.'''
+    subject_type = type(subject)
+
+    if subject_type not in _CONTAINER_KINDS:
+        if issubclass(subject_type, abc.Mapping):
+            _CONTAINER_KINDS[subject_type] = _MAPPING
+        elif issubclass(subject_type, (list, tuple)):
+            _CONTAINER_KINDS[subject_type] = _SEQUENCE
+        else:
+            _CONTAINER_KINDS[subject_type] = _LEAF
+
+    return _CONTAINER_KINDS[subject_type]
+
+
+def _iter_children(node, kind: str) -> Iterator[Tuple[Any, Any]]:
+    '''Return iterator of (key or index, child) pairs for a container.'''
+    return iter(node.items()) if kind is _MAPPING else enumerate(node)
+
+
+def _replace_mapping_keys(
+        node: Mapping,
+        new_key_mapping: Mapping,
+        replaced: list,
+        has_renames: bool,
+        in_place: bool,
+    ):
+    '''Return node with keys and replaced children swapped in, or node itself if nothing changed.'''
+    if not has_renames and not replaced:
+        return node
+
+    get_key = new_key_mapping.get
+
+    if in_place and isinstance(node, abc.MutableMapping):
+        node.update(replaced)
+
+        if has_renames:
+            items = list(node.items())
+            node.clear()
+
+            for key, val in items:
+                node[get_key(key, key)] = val
+
+        return node
+
+    if not replaced:
+        return {get_key(key, key): val for key, val in node.items()}
+
+    get_child = dict(replaced).get
+    return {get_key(key, key): get_child(key, val) for key, val in node.items()}
+
+
+def _replace_sequence_items(node: Union[list, tuple], replaced: list, in_place: bool):
+    '''Return node with replaced children swapped in, or node itself if nothing changed.'''
+    if not replaced:
+        return node
+
+    new = node if in_place and isinstance(node, list) else list(node)
+
+    for index, child in replaced:
+        new[index] = child
+
+    return tuple(new) if isinstance(node, tuple) else new
 
 
 def get_key_by_val(subject: dict, target_val):
@@ -92,12 +412,79 @@ def get_key_by_val(subject: dict, target_val):
     >>> target_val = "val2"
     >>> get_key_by_val(subject, target_val)
     "key2"
+
+    If subject is a BiDict, its reverse index is used instead of scanning subject.
     '''
+    if isinstance(subject, BiDict):
+        return subject.get_key(target_val)
+
     for key, val in subject.items():
         if val == target_val:
             return key
 
 
+# Sentinel for values that do not belong to any key in a BiDict
+_NO_OWNER = object()
+
+
+class BiDict(abc.MutableMapping):
+    '''Dict with unique, hashable values, that can look up keys by value in O(1).
+
+    A reverse index of value -> key is kept in step with every insert and delete.
+    Raise ValueError if a value is assigned that already belongs to another key.
+
+    >>> codes = BiDict({'key1': 'val1', 'key2': 'val2'})
+    >>> codes.get_key('val2')
+    'key2'
+    >>> codes['key3'] = 'val1'
+    Traceback (most recent call last):
+    ...
+    ValueError: ('Value already belongs to another key', 'val1', 'key1')
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self._forward: dict = {}
+        self._reverse: dict = {}
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._forward[key]
+
+    def __setitem__(self, key, val):
+        owner = self._reverse.get(val, _NO_OWNER)
+
+        if owner is not _NO_OWNER and owner != key:
+            raise ValueError('Value already belongs to another key', val, owner)
+
+        if key in self._forward:
+            del self._reverse[self._forward[key]]
+
+        self._forward[key] = val
+        self._reverse[val] = key
+
+    def __delitem__(self, key):
+        val = self._forward.pop(key)
+        del self._reverse[val]
+
+    def __iter__(self):
+        return iter(self._forward)
+
+    def __len__(self):
+        return len(self._forward)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self._forward!r})'
+
+    def get_key(self, val, default=None):
+        '''Return the key for val, or default if no key has val.'''
+        return self._reverse.get(val, default)
+
+    @property
+    def inverse(self) -> Mapping:
+        '''Read only value -> key view of this BiDict.'''
+        return MappingProxyType(self._reverse)
+
+
 class _DataConverterBase(TypedDict):
     conversion_function: Callable[[str], Any]
 
@@ -126,24 +513,81 @@ def coerce_datatypes(datatype_map: DataConverterMap, data: dict) -> dict:
     Exceptions will return original exception is first argument,
     key as second argument, and original value as third argument (if applicable).
     """
-    updated = {}
+    return compile_converter(datatype_map)(data)
 
-    for key, val in datatype_map.items():
-        try:
-            original_value = data[key]
-        except KeyError as e:
-            if 'default' not in val:
-                raise KeyError(e, key) from e
 
-            original_value = val['default']
+# Sentinel default for DataConverter fields that have no 'default'
+_REQUIRED = object()
 
-        conversion_func = val['conversion_function']
 
-        try:
-            new_value = conversion_func(original_value)
-        except (ValueError, TypeError) as e:
-            raise ValueError(e, (key, original_value)) from e
+def compile_converter(datatype_map: DataConverterMap) -> 'CompiledConverter':
+    """Read datatype_map once, and return a callable that coerces records with it.
+
+    >>> convert = compile_converter({'index': {'conversion_function': int, 'default': 0}})
+    >>> convert({'index': '4'})
+    {'index': 4}
+    >>> convert({})
+    {'index': 0}
+    """
+    return CompiledConverter(datatype_map)
 
-        updated[key] = new_value
 
-    return updated
+class CompiledConverter:
+    """Coerce records with a DataConverterMap that has already been read.
+
+    Calling an instance behaves exactly like coerce_datatypes with the same map.
+    """
+
+    def __init__(self, datatype_map: DataConverterMap):
+        self.fields = tuple(
+            (key, val['conversion_function'], val.get('default', _REQUIRED))
+            for key, val in datatype_map.items()
+        )
+
+    def __call__(self, data: dict) -> dict:
+        updated = {}
+
+        for key, conversion_func, default in self.fields:
+            try:
+                original_value = data[key]
+            except KeyError as e:
+                if default is _REQUIRED:
+                    raise KeyError(e, key) from e
+
+                original_value = default
+
+            try:
+                updated[key] = conversion_func(original_value)
+            except (ValueError, TypeError) as e:
+                raise ValueError(e, (key, original_value)) from e
+
+        return updated
+
+    def coerce_many(
+            self,
+            records: Iterable[dict],
+            fail_fast: bool = False,
+        ) -> Tuple[List[dict], Dict[int, Exception]]:
+        """Coerce every record in a list or iterator of records.
+
+        Return a list of coerced records, and a dict mapping the index
+        of each record that failed to the KeyError or ValueError it raised.
+        If fail_fast is True, raise the first error instead.
+        """
+        if fail_fast:
+            return list(self.iter_coerce(records)), {}
+
+        coerced = []
+        errors = {}
+
+        for index, data in enumerate(records):
+            try:
+                coerced.append(self(data))
+            except (KeyError, ValueError) as e:
+                errors[index] = e
+
+        return coerced, errors
+
+    def iter_coerce(self, records: Iterable[dict]) -> Iterator[dict]:
+        """Lazily coerce records, raising on the first record that fails."""
+        return map(self, records)
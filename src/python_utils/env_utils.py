@@ -4,7 +4,10 @@
 Module for fetching environment variables.
 '''
 import os
-from typing import Optional, Sequence
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Sequence, Type, Union, get_args, get_origin
+
+from python_utils.typing_utils import get_typed_dict_schema
 
 
 def getenv_str(variable: str, default: Optional[str] = None) -> str:
@@ -17,16 +20,7 @@ def getenv_str(variable: str, default: Optional[str] = None) -> str:
     if default is not None:
         _verify_default_value_type(default, str)
 
-    result = clean_string(os.environ.get(variable))
-
-    if result is None and default is not None:
-        return default
-
-    if result is None:
-        raise EnvironmentError(
-            f'You must set a vaild "{variable}" in the environment.')
-
-    return result
+    return _get_env_value(variable, os.environ.get(variable), _parse_str, default)
 
 
 def getenv_int(variable: str, default: Optional[int]) -> int:
@@ -39,22 +33,7 @@ def getenv_int(variable: str, default: Optional[int]) -> int:
     if default is not None:
         _verify_default_value_type(default, int)
 
-    str_value = clean_string(os.environ.get(variable))
-
-    if str_value is None and default is not None:
-        return default
-
-    if str_value is None:
-        raise EnvironmentError(
-            f'You must set a vaild "{variable}" in the environment.')
-
-    try:
-        result = int(str_value)
-    except ValueError:
-        raise EnvironmentError(
-            f'Invaild value found for evironment variable "{variable}". Expected integer, found: "{str_value}"."')
-
-    return result
+    return _get_env_value(variable, os.environ.get(variable), _parse_int, default)
 
 
 def getenv_bool(variable: str, default: Optional[bool]) -> bool:
@@ -67,7 +46,12 @@ def getenv_bool(variable: str, default: Optional[bool]) -> bool:
     if default is not None:
         _verify_default_value_type(default, bool)
 
-    str_value = clean_string(os.environ.get(variable))
+    return _get_env_value(variable, os.environ.get(variable), _parse_bool, default)
+
+
+def _get_env_value(variable: str, value: Optional[str], parse: Callable[[str, str], object], default):
+    '''Clean and parse value of variable, or return default if it is not set.'''
+    str_value = clean_string(value)
 
     if str_value is None and default is not None:
         return default
@@ -76,6 +60,22 @@ def getenv_bool(variable: str, default: Optional[bool]) -> bool:
         raise EnvironmentError(
             f'You must set a vaild "{variable}" in the environment.')
 
+    return parse(variable, str_value)
+
+
+def _parse_str(variable: str, str_value: str) -> str:
+    return str_value
+
+
+def _parse_int(variable: str, str_value: str) -> int:
+    try:
+        return int(str_value)
+    except ValueError:
+        raise EnvironmentError(
+            f'Invaild value found for evironment variable "{variable}". Expected integer, found: "{str_value}"."')
+
+
+def _parse_bool(variable: str, str_value: str) -> bool:
     if str_value.lower() in ('1', 'true', 'yes', 'y'):
         return True
 
@@ -86,6 +86,107 @@ def getenv_bool(variable: str, default: Optional[bool]) -> bool:
         f'Invaild value found for evironment variable "{variable}". Expected boolean, found: "{str_value}"."')
 
 
+# map types that can be read from the environment to their parsing functions
+ENV_PARSERS: Dict[type, Callable[[str, str], object]] = {
+    str: _parse_str,
+    int: _parse_int,
+    bool: _parse_bool,
+}
+
+# Process wide cache of configs loaded by load_env_config
+_ENV_CONFIGS: Dict[tuple, Mapping] = {}
+
+
+def load_env_config(schema: Type, defaults: Optional[dict] = None) -> Mapping:
+    '''Read every field of a TypedDict schema from the environment at once.
+
+    Fields may be str, int, bool, or Optional of those. Optional fields are None if not set.
+    Values are cleaned and parsed with the same rules as getenv_str, getenv_int and getenv_bool,
+    and defaults are used for fields that are not set.
+
+    The environment is only read the first time a schema is loaded,
+    and the same read only config is returned after that, until refresh_env_config is called.
+
+    Raise TypeError if a default is the wrong type, or a field type cannot be read.
+    Raise EnvironmentError listing every variable that is missing or invalid.
+    '''
+    defaults = defaults or {}
+    cache_key = (schema, tuple(sorted(defaults.items())))
+
+    try:
+        return _ENV_CONFIGS[cache_key]
+    except KeyError:
+        pass
+
+    environ = os.environ
+    config = {}
+    errors = []
+
+    for variable, field_type, optional, parse in _get_env_fields(schema):
+        default = defaults.get(variable)
+
+        if default is not None:
+            _verify_default_value_type(default, field_type)
+
+        if optional and default is None and clean_string(environ.get(variable)) is None:
+            config[variable] = None
+            continue
+
+        try:
+            config[variable] = _get_env_value(variable, environ.get(variable), parse, default)
+        except EnvironmentError as err:
+            errors.append(str(err))
+
+    if errors:
+        raise EnvironmentError('\n'.join(errors))
+
+    _ENV_CONFIGS[cache_key] = MappingProxyType(config)
+
+    return _ENV_CONFIGS[cache_key]
+
+
+def refresh_env_config():
+    '''Clear configs loaded by load_env_config, so the environment is read again on next load.'''
+    _ENV_CONFIGS.clear()
+
+
+# Cache of (variable, type, optional, parsing function) for the fields of each schema
+_ENV_FIELDS: Dict[type, tuple] = {}
+
+
+def _get_env_fields(schema: Type) -> tuple:
+    '''Return (variable, type, optional, parsing function) for each field in schema.'''
+    try:
+        return _ENV_FIELDS[schema]
+    except KeyError:
+        pass
+
+    fields = []
+
+    for variable, field_type in get_typed_dict_schema(schema).type_hints.items():
+        field_type, optional = _unwrap_optional(field_type)
+        parse = ENV_PARSERS.get(field_type)
+
+        if parse is None:
+            raise TypeError(f'Cannot read "{variable}" of type {field_type} from the environment')
+
+        fields.append((variable, field_type, optional, parse))
+
+    _ENV_FIELDS[schema] = tuple(fields)
+
+    return _ENV_FIELDS[schema]
+
+
+def _unwrap_optional(field_type) -> tuple:
+    '''Return the type inside Optional[type], and whether field_type was Optional.'''
+    args = get_args(field_type)
+
+    if get_origin(field_type) == Union and len(args) == 2 and type(None) in args:
+        return next(_ for _ in args if _ is not type(None)), True
+
+    return field_type, False
+
+
 def clean_string(value: Optional[str]) -> Optional[str]:
     '''Cleans a string of quote and space characters.
     >>> clean_string("'True'")
@@ -2,8 +2,29 @@
 '''
 Useful functions to work with iterables.
 '''
-from functools import reduce
-from typing import Any, Callable, Iterable, Tuple
+import os
+from collections import deque
+from concurrent.futures import Executor, Future
+from itertools import islice, tee
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+
+class PartitionBufferFull(Exception):
+    '''Exception to raise if a lazy_partition buffer grows past its maximum size.'''
+
+
+class ParallelElementError(Exception):
+    '''Exception raised by parallel_map if func raises for an element.
+
+    The original exception is the first argument, and the index of the element is the second.'''
+
+    @property
+    def error(self) -> BaseException:
+        return self.args[0]
+
+    @property
+    def index(self) -> int:
+        return self.args[1]
 
 
 def partition(subject: Iterable, filter_func: Callable[[Any], bool]) -> Tuple[Tuple, Tuple]:
@@ -11,11 +32,354 @@ def partition(subject: Iterable, filter_func: Callable[[Any], bool]) -> Tuple[Tu
 
     The first tuple contains all elements that match the filter,
     the second contains those that do not.'''
+    matches = []
+    non_matches = []
 
-    def reducer(accum: Tuple[Tuple, Tuple], el):
+    for el in subject:
         if filter_func(el):
-            return (*accum[0], el), accum[1]
+            matches.append(el)
+        else:
+            non_matches.append(el)
+
+    return tuple(matches), tuple(non_matches)
+
+
+def lazy_partition(
+        subject: Iterable,
+        filter_func: Callable[[Any], bool],
+        max_buffered: Optional[int] = None,
+    ) -> Tuple[Iterator, Iterator]:
+    '''Divide an iterable into 2 lazy iterators according to filter func.
+
+    The first iterator yields all elements that match the filter,
+    the second yields those that do not. subject is only read as far as needed,
+    so this works on very large or infinite iterables. filter_func is called once per element.
+
+    Elements read while looking for the next element of one iterator are buffered for the other.
+    If max_buffered is set, raise PartitionBufferFull when a buffer grows past it. The element
+    that filled it is kept, so both iterators can still be read after the error is caught.
+
+    >>> evens, odds = lazy_partition(range(10 ** 9), lambda x: x % 2 == 0)
+    >>> next(evens), next(odds), next(evens)
+    (0, 1, 2)
+    '''
+    source = iter(subject)
+    buffers: Tuple[Deque, Deque] = (deque(), deque())
+
+    return (
+        _PartitionIterator(source, filter_func, max_buffered, buffers, 0),
+        _PartitionIterator(source, filter_func, max_buffered, buffers, 1),
+    )
+
+
+class _PartitionIterator:
+    '''One of the iterators returned by lazy_partition.
+
+    Unlike a generator, it can still be read after it raises PartitionBufferFull.'''
+    __slots__ = ('source', 'filter_func', 'max_buffered', 'buffers', 'wanted')
+
+    def __init__(
+            self,
+            source: Iterator,
+            filter_func: Callable[[Any], bool],
+            max_buffered: Optional[int],
+            buffers: Tuple[Deque, Deque],
+            wanted: int,
+        ):
+        self.source = source
+        self.filter_func = filter_func
+        self.max_buffered = max_buffered
+        self.buffers = buffers
+        self.wanted = wanted
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        buffer = self.buffers[self.wanted]
+
+        if buffer:
+            return buffer.popleft()
+
+        for el in self.source:
+            found = 0 if self.filter_func(el) else 1
+
+            if found == self.wanted:
+                return el
+
+            other_buffer = self.buffers[found]
+            other_buffer.append(el)
+
+            if self.max_buffered is not None and len(other_buffer) > self.max_buffered:
+                raise PartitionBufferFull(
+                    f'More than {self.max_buffered} elements buffered for the other iterator')
+
+        raise StopIteration
+
+
+def bucketize(subject: Iterable, key_func: Callable[[Any], Hashable]) -> Dict[Hashable, Tuple]:
+    '''Divide an iterable into tuples of elements with the same key_func result.
+
+    Buckets are in the order their keys were first found.
+
+    >>> bucketize(['apple', 'bob', 'avocado', 'cat'], lambda x: x[0])
+    {'a': ('apple', 'avocado'), 'b': ('bob',), 'c': ('cat',)}
+    '''
+    buckets: Dict[Hashable, list] = {}
+
+    for el in subject:
+        key = key_func(el)
+        bucket = buckets.get(key)
+
+        if bucket is None:
+            buckets[key] = [el]
+        else:
+            bucket.append(el)
+
+    return {key: tuple(bucket) for key, bucket in buckets.items()}
+
+
+def batched(
+        subject: Iterable,
+        max_items: int,
+        max_bytes: Optional[int] = None,
+        size_func: Callable[[Any], int] = len,
+    ) -> Iterator[List]:
+    '''Lazily yield lists of consecutive elements of subject, without reading ahead of the current list.
+
+    Each list has at most max_items elements. If max_bytes is set, the size_func results
+    of the elements in each list also add up to at most max_bytes.
+    Every list is filled as far as the limits allow before it is yielded.
+
+    Raise ValueError if max_items or max_bytes is not positive,
+    or if a single element is larger than max_bytes.
+
+    >>> list(batched(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    >>> list(batched(['ab', 'cd', 'e', 'fgh'], 10, max_bytes=4))
+    [['ab', 'cd'], ['e', 'fgh']]
+    '''
+    if max_items < 1:
+        raise ValueError(f'max_items must be at least 1, not {max_items}')
+
+    if max_bytes is None:
+        return _batched_by_count(iter(subject), max_items)
+
+    if max_bytes < 1:
+        raise ValueError(f'max_bytes must be at least 1, not {max_bytes}')
+
+    return _batched_by_size(iter(subject), max_items, max_bytes, size_func)
+
+
+def windowed(subject: Iterable, size: int, step: int = 1) -> Iterator[Tuple]:
+    '''Lazily yield tuples of size consecutive elements of subject, starting every step elements.
+
+    Only the current window is held in memory.
+    Elements after the last full window are not yielded.
+
+    Raise ValueError if size or step is not positive.
+
+    >>> list(windowed([1, 2, 3, 4, 5], 3))
+    [(1, 2, 3), (2, 3, 4), (3, 4, 5)]
+    >>> list(windowed([1, 2, 3, 4, 5], 2, step=2))
+    [(1, 2), (3, 4)]
+    '''
+    if size < 1:
+        raise ValueError(f'size must be at least 1, not {size}')
+
+    if step < 1:
+        raise ValueError(f'step must be at least 1, not {step}')
+
+    return _windowed(iter(subject), size, step)
+
+
+def parallel_map(
+        func: Callable[[Any], Any],
+        subject: Iterable,
+        executor: Executor,
+        chunk_size: Optional[int] = None,
+        max_pending_chunks: Optional[int] = None,
+        worker_count: Optional[int] = None,
+    ) -> Iterator:
+    '''Lazily yield func(el) for each element of subject, in order, computed on executor.
+
+    Elements are sent to the executor in chunks, to amortize the cost of each task
+    (and of pickling, for a ProcessPoolExecutor, which also needs a picklable func).
+    If chunk_size is not set, it is picked from the number of workers and the length of subject.
+    At most max_pending_chunks chunks are submitted ahead of the results that have been read,
+    which defaults to 2 per worker.
+    If worker_count is not set, it is read from a ThreadPoolExecutor or ProcessPoolExecutor,
+    and is the number of cpus for other executors.
+
+    Raise ValueError if chunk_size, max_pending_chunks or worker_count is less than 1.
+    Raise ParallelElementError(original exception, index) if func raises for any element.
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> with ThreadPoolExecutor(4) as executor:
+    ...     list(parallel_map(abs, [-1, 2, -3], executor))
+    [1, 2, 3]
+    '''
+    for name, value in (
+            ('chunk_size', chunk_size),
+            ('max_pending_chunks', max_pending_chunks),
+            ('worker_count', worker_count),
+        ):
+        if value is not None and value < 1:
+            raise ValueError(f'{name} must be at least 1, not {value}')
+
+    if worker_count is None:
+        worker_count = _get_worker_count(executor)
+
+    if chunk_size is None:
+        chunk_size = _get_chunk_size(subject, worker_count)
+
+    if max_pending_chunks is None:
+        max_pending_chunks = worker_count * 2
+
+    return _parallel_map(func, iter(subject), executor, chunk_size, max_pending_chunks)
+
+
+def parallel_partition(
+        subject: Iterable,
+        filter_func: Callable[[Any], bool],
+        executor: Executor,
+        chunk_size: Optional[int] = None,
+        worker_count: Optional[int] = None,
+    ) -> Tuple[Tuple, Tuple]:
+    '''Divide an iterable into 2 tuples according to filter func, calling filter_func on executor.
+
+    Returns the same result as partition. Only the elements are sent to the executor,
+    and only whether each one matched is sent back.
+    See parallel_map for how elements are chunked, and which exceptions are raised.'''
+    elements, to_check = tee(subject)
+    matched = parallel_map(filter_func, to_check, executor, chunk_size, worker_count=worker_count)
+
+    matches = []
+    non_matches = []
+
+    for el, is_match in zip(elements, matched):
+        if is_match:
+            matches.append(el)
+        else:
+            non_matches.append(el)
+
+    return tuple(matches), tuple(non_matches)
+
+
+def _parallel_map(
+        func: Callable[[Any], Any],
+        source: Iterator,
+        executor: Executor,
+        chunk_size: int,
+        max_pending_chunks: int,
+    ) -> Iterator:
+    '''Generator for parallel_map, so its arguments are checked as soon as it is called.'''
+    pending: Deque[Future] = deque()
+    start_index = 0
+
+    try:
+        while True:
+            while len(pending) < max_pending_chunks:
+                chunk = list(islice(source, chunk_size))
+
+                if not chunk:
+                    break
+
+                pending.append(executor.submit(_apply_to_chunk, func, chunk, start_index))
+                start_index += len(chunk)
+
+            if not pending:
+                return
+
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _batched_by_count(source: Iterator, max_items: int) -> Iterator[List]:
+    '''Generator for batched, when only the number of elements is limited.'''
+    while True:
+        batch = list(islice(source, max_items))
+
+        if not batch:
+            return
+
+        yield batch
+
+
+def _batched_by_size(
+        source: Iterator,
+        max_items: int,
+        max_bytes: int,
+        size_func: Callable[[Any], int],
+    ) -> Iterator[List]:
+    '''Generator for batched, when the total size of the elements is limited too.'''
+    batch: list = []
+    batch_bytes = 0
+
+    for index, el in enumerate(source):
+        size = size_func(el)
+
+        if size > max_bytes:
+            raise ValueError(f'Element {index} is {size} bytes, more than max_bytes of {max_bytes}')
+
+        if len(batch) == max_items or batch_bytes + size > max_bytes:
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+        batch.append(el)
+        batch_bytes += size
+
+    if batch:
+        yield batch
+
+
+def _windowed(source: Iterator, size: int, step: int) -> Iterator[Tuple]:
+    '''Generator for windowed, so its arguments are checked as soon as it is called.'''
+    window: Deque = deque(islice(source, size), maxlen=size)
+
+    if len(window) < size:
+        return
+
+    yield tuple(window)
+
+    while True:
+        advance = list(islice(source, step))
+
+        if len(advance) < step:
+            return
+
+        window.extend(advance)
+        yield tuple(window)
+
+
+def _apply_to_chunk(func: Callable[[Any], Any], chunk: list, start_index: int) -> List:
+    '''Return func applied to every element in chunk, or raise ParallelElementError.'''
+    results = []
+
+    for offset, el in enumerate(chunk):
+        try:
+            results.append(func(el))
+        except Exception as e:
+            raise ParallelElementError(e, start_index + offset) from e
+
+    return results
+
+
+def _get_worker_count(executor: Executor) -> int:
+    '''Return number of workers of a ThreadPoolExecutor or ProcessPoolExecutor, or else the number of cpus.
+
+    Executor has no public worker count, so this reads the attribute both stdlib executors set.'''
+    return getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+
 
-        return accum[0], (*accum[1], el)
+def _get_chunk_size(subject: Iterable, worker_count: int) -> int:
+    '''Pick a chunk size that gives each worker about 4 chunks, when the length of subject is known.'''
+    try:
+        length = len(subject)  # type: ignore
+    except TypeError:
+        return 256
 
-    return reduce(reducer, subject, ((), ()))
+    return max(1, min(length // (worker_count * 4), 4096))
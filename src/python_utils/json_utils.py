@@ -3,8 +3,25 @@
 Module with helpful code for dealing with json.
 '''
 import json
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import Executor
+from datetime import date, datetime
 from decimal import Decimal
+from enum import Enum
 from functools import partial
+from operator import attrgetter
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, Optional, Union
+from uuid import UUID
+
+from python_utils.iterable_utils import parallel_map
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def decimal_default(obj):
@@ -20,3 +37,499 @@ def decimal_default(obj):
     raise TypeError(
         f'Object of type "{obj_type}" is not JSON serializable'
     )
+
+
+# size of the chunks iter_dumps_bytes and dump serialize objects in
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def dumps(obj, compact: bool = True) -> str:
+    '''Serialize obj to a compact json string, with non ascii characters left as they are.
+
+    Types json does not support are serialized by json_default.
+    Uses orjson if it is installed, and the json module otherwise,
+    and the output is the same with either, for the types json_default serializes.
+    NaN and infinite floats are not valid json, and are written differently by each.
+    Strings that cannot be utf-8 encoded, like lone surrogates, are escaped like the json module does.
+
+    If compact is False, the output is the same as json.dumps(obj, default=json_default),
+    with spaces after separators and non ascii characters escaped, written by the json module.
+
+    Raise TypeError if obj contains a type that cannot be serialized.
+
+    >>> dumps({'price': Decimal('5.5'), 'tags': ('a', 'b')})
+    '{"price":5.5,"tags":["a","b"]}'
+    >>> dumps({'price': Decimal('5.5'), 'name': 'Zoë'}, compact=False)
+    '{"price": 5.5, "name": "Zo\\\\u00eb"}'
+    '''
+    if not compact:
+        return _JSON_DUMPS_ENCODER.encode(obj)
+
+    return dumps_bytes(obj).decode('utf-8')
+
+
+def dumps_bytes(obj, compact: bool = True) -> bytes:
+    '''Serialize obj like dumps, to utf-8 encoded bytes.'''
+    if not compact:
+        return _JSON_DUMPS_ENCODER.encode(obj).encode('ascii')
+
+    if orjson is None:
+        return _stdlib_dumps_bytes(obj)
+
+    return _orjson_dumps_bytes(obj)
+
+
+def dump(obj, fp: IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE, compact: bool = True) -> int:
+    '''Write obj serialized like dumps_bytes to the binary file fp, in chunks from iter_dumps_bytes.
+
+    Return the number of bytes written.'''
+    written = 0
+
+    for chunk in iter_dumps_bytes(obj, chunk_size, compact):
+        fp.write(chunk)
+        written += len(chunk)
+
+    return written
+
+
+def iter_dumps_bytes(obj, chunk_size: int = DEFAULT_CHUNK_SIZE, compact: bool = True) -> Iterator[bytes]:
+    '''Lazily yield obj serialized like dumps_bytes, in chunks of at least chunk_size bytes, except the last.
+
+    A top level list or tuple, or dict with string keys, is serialized a few elements at a time,
+    as are the lists and tuples in that dict, so only about a chunk of json is held at a time.
+    Each element is serialized whole, so chunks can be bigger than chunk_size.
+
+    >>> list(iter_dumps_bytes({'items': [1, 2, 3]}, chunk_size=4))
+    [b'{"items":', b'[1,2', b',3]}']
+    '''
+    buffer = bytearray()
+
+    for piece in _iter_dumps_pieces(obj, chunk_size, compact):
+        buffer += piece
+
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
+
+
+def loads(s: Union[str, bytes], numbers: str = 'float'):
+    '''Deserialize json from s, reading numbers with a fraction or exponent as numbers says.
+
+    numbers is "float", "decimal" to read them as Decimals without losing precision,
+    or "lazy_decimal" to read them as LazyDecimals, which only build the Decimal when it is used.
+    Floats are read with orjson if it is installed, and the json module otherwise.
+    Text with a number of 19 digits or more is always read by the json module,
+    as orjson reads integers outside the 64 bit range as floats.
+
+    Raise ValueError if numbers is not one of those, and json.JSONDecodeError if s is not valid json.
+
+    >>> loads('{"price": 5.10, "count": 2}', numbers='decimal')
+    {'price': Decimal('5.10'), 'count': 2}
+    '''
+    if numbers == 'float' and orjson is not None and not _has_long_number(s):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # the json module accepts NaN and Infinity, which orjson does not, and raises its own errors
+            pass
+
+    decoder = _get_decoder(numbers)
+
+    if not isinstance(s, str):
+        s = s.decode(json.detect_encoding(s), 'surrogatepass')
+
+    return decoder.decode(s)
+
+
+class LazyDecimal:
+    '''Number read from json by loads, which is kept as text until it is used as a Decimal.
+
+    >>> number = loads('[0.10]', numbers='lazy_decimal')[0]
+    >>> number.decimal
+    Decimal('0.10')
+    '''
+    __slots__ = ('text', '_decimal')
+
+    def __init__(self, text: str):
+        self.text = text
+        self._decimal: Optional[Decimal] = None
+
+    @property
+    def decimal(self) -> Decimal:
+        '''Return number as a Decimal, which is built the first time it is used.'''
+        if self._decimal is None:
+            self._decimal = Decimal(self.text)
+
+        return self._decimal
+
+    def __float__(self) -> float:
+        return float(self.text)
+
+    def __int__(self) -> int:
+        return int(self.decimal)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LazyDecimal):
+            return self.decimal == other.decimal
+
+        return self.decimal == other
+
+    def __hash__(self) -> int:
+        return hash(self.decimal)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f'LazyDecimal({self.text!r})'
+
+
+def iter_ndjson(
+        fp: IO,
+        numbers: str = 'float',
+        executor: Optional[Executor] = None,
+        block_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator:
+    '''Lazily yield the records in fp, a file or mmap of utf-8 newline delimited json, read like loads.
+
+    fp is read block_size bytes at a time, and blank lines are skipped.
+    If executor is set, lines are read on it with parallel_map, in order.
+
+    Raise json.JSONDecodeError if a line is not valid json,
+    or ParallelElementError(json.JSONDecodeError, index of the record) if executor is set.
+
+    >>> import io
+    >>> list(iter_ndjson(io.BytesIO(b'{"a": 1}\\n\\n[2.5]\\n')))
+    [{'a': 1}, [2.5]]
+    '''
+    lines = _iter_lines(fp, block_size)
+
+    if executor is None:
+        return _loads_lines(lines, numbers)
+
+    return parallel_map(partial(loads, numbers=numbers), lines, executor)
+
+
+def read_ndjson(path: str, numbers: str = 'float', executor: Optional[Executor] = None) -> Iterator:
+    '''Lazily yield the records in the newline delimited json file at path, memory mapped.
+
+    See iter_ndjson.'''
+    with open(path, 'rb') as fp:
+        # empty files cannot be memory mapped
+        if os.fstat(fp.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter_ndjson(mapped, numbers, executor)
+
+
+class NdjsonWriter:
+    '''Buffered writer of records to a binary file as newline delimited json, serialized by dumps_bytes.
+
+    The buffer is written to the file when it reaches buffer_size bytes, and on flush.
+    Use as a context manager to flush on exit.
+
+    >>> import io
+    >>> fp = io.BytesIO()
+    >>> with NdjsonWriter(fp) as writer:
+    ...     writer.write_many([{'price': Decimal('5.5')}, [1, 2]])
+    >>> fp.getvalue()
+    b'{"price":5.5}\\n[1,2]\\n'
+    '''
+
+    def __init__(self, fp: IO[bytes], buffer_size: int = DEFAULT_CHUNK_SIZE):
+        self.fp = fp
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    def write(self, record):
+        '''Add record to the buffer, and write the buffer if it is full.'''
+        buffer = self._buffer
+        buffer += dumps_bytes(record)
+        buffer += b'\n'
+
+        if len(buffer) >= self.buffer_size:
+            self._write_buffer()
+
+    def write_many(self, records: Iterable):
+        '''Add each record to the buffer, writing the buffer whenever it is full.'''
+        buffer = self._buffer
+        buffer_size = self.buffer_size
+
+        for record in records:
+            buffer += dumps_bytes(record)
+            buffer += b'\n'
+
+            if len(buffer) >= buffer_size:
+                self._write_buffer()
+
+    def flush(self):
+        '''Write the buffer, and flush the file.'''
+        self._write_buffer()
+        self.fp.flush()
+
+    def _write_buffer(self):
+        if self._buffer:
+            self.fp.write(self._buffer)
+            self._buffer.clear()
+
+    def __enter__(self) -> 'NdjsonWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+def json_default(obj):
+    '''Custom default func for json.dumps that serializes the types in _SERIALIZERS.
+
+    Decimals and LazyDecimals are serialized as floats, like decimal_default, dates and datetimes as iso strings,
+    UUIDs as strings, sets as lists, Enums as their values, immutables Maps as dicts,
+    and numpy scalars and arrays as the python numbers and lists they hold.
+
+    Raise TypeError if there is no serializer for the type of obj.
+
+    >>> json.dumps({'id': UUID(int=1), 'when': date(2020, 12, 1)}, default=json_default)
+    '{"id": "00000000-0000-0000-0000-000000000001", "when": "2020-12-01"}'
+    '''
+    serializer = _SERIALIZERS.get(type(obj))
+
+    if serializer is None:
+        serializer = _get_serializer(type(obj))
+
+    return serializer(obj)
+
+
+# serializers by type for json_default, which also caches the serializer found for subclasses
+_SERIALIZERS: Dict[type, Callable[[Any], Any]] = {
+    Decimal: float,
+    LazyDecimal: float,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    UUID: str,
+    set: list,
+    frozenset: list,
+    # orjson serializes Enums as their values itself
+    Enum: attrgetter('value'),
+}
+
+
+def _get_serializer(data_type: type) -> Callable[[Any], Any]:
+    '''Return serializer for the closest registered base class of data_type, and cache it.
+
+    Raise TypeError if there is none.'''
+    _add_optional_serializers()
+
+    for base in data_type.__mro__:
+        serializer = _SERIALIZERS.get(base)
+
+        if serializer is not None:
+            _SERIALIZERS[data_type] = serializer
+            return serializer
+
+    raise TypeError(
+        f'Object of type "{data_type.__name__}" is not JSON serializable'
+    )
+
+
+def _add_optional_serializers():
+    '''Add serializers for numpy and immutables types, if those packages have been imported.
+
+    Their objects cannot exist until they are, so neither is imported here.'''
+    numpy = sys.modules.get('numpy')
+
+    if numpy is not None and numpy.ndarray not in _SERIALIZERS:
+        _SERIALIZERS[numpy.generic] = numpy.generic.item
+        _SERIALIZERS[numpy.ndarray] = numpy.ndarray.tolist
+
+    immutables = sys.modules.get('immutables')
+
+    if immutables is not None and immutables.Map not in _SERIALIZERS:
+        _SERIALIZERS[immutables.Map] = dict
+
+
+def _iter_dumps_pieces(obj, chunk_size: int, compact: bool) -> Iterator[bytes]:
+    '''Yield json of obj in pieces, streaming a top level dict with string keys, and the lists in it.'''
+    if type(obj) is not dict or not all(type(key) is str for key in obj):
+        yield from _iter_dumps_list_pieces(obj, chunk_size, compact)
+        return
+
+    item_separator, key_separator = _SEPARATORS[compact]
+    yield b'{'
+
+    for index, (key, value) in enumerate(obj.items()):
+        if index:
+            yield item_separator
+
+        yield dumps_bytes(key, compact) + key_separator
+        yield from _iter_dumps_list_pieces(value, chunk_size, compact)
+
+    yield b'}'
+
+
+def _iter_dumps_list_pieces(obj, chunk_size: int, compact: bool) -> Iterator[bytes]:
+    '''Yield json of obj in pieces of about chunk_size bytes, if it is a list or tuple.
+
+    Elements are serialized in slices, with the brackets of each slice's json left out,
+    and the length of each slice is picked from the size of the json of the last one.'''
+    if type(obj) is not list and type(obj) is not tuple:
+        yield dumps_bytes(obj, compact)
+        return
+
+    item_separator = _SEPARATORS[compact][0]
+    yield b'['
+    start = 0
+    slice_len = 1
+
+    while start < len(obj):
+        if start:
+            yield item_separator
+
+        encoded = dumps_bytes(obj[start:start + slice_len], compact)
+        yield memoryview(encoded)[1:-1]
+
+        start += slice_len
+        slice_len = max(1, chunk_size * slice_len // len(encoded))
+
+    yield b']'
+
+
+# item and key separators by the compact argument of dumps
+_SEPARATORS = {
+    True: (b',', b':'),
+    False: (b', ', b': '),
+}
+
+_STDLIB_ENCODER = json.JSONEncoder(
+    separators=(',', ':'),
+    ensure_ascii=False,
+    default=json_default,
+)
+
+# for strings that cannot be utf-8 encoded, like lone surrogates from decoding "\ud800"
+_STDLIB_ASCII_ENCODER = json.JSONEncoder(
+    separators=(',', ':'),
+    default=json_default,
+)
+
+# same settings as json.dumps(obj, default=json_default), for dumps(obj, compact=False)
+_JSON_DUMPS_ENCODER = json.JSONEncoder(default=json_default)
+
+
+def _loads_lines(lines: Iterable, numbers: str) -> Iterator:
+    '''Yield each line read like loads, calling the decoder directly, as newline delimited json is utf-8.'''
+    if numbers != 'float' or orjson is None:
+        decoder = _get_decoder(numbers)
+
+        for line in lines:
+            yield decoder.decode(line if isinstance(line, str) else line.decode('utf-8'))
+
+        return
+
+    orjson_loads = orjson.loads
+
+    for line in lines:
+        if _has_long_number(line):
+            yield loads(line, numbers)
+            continue
+
+        try:
+            yield orjson_loads(line)
+        except orjson.JSONDecodeError:
+            yield loads(line, numbers)
+
+
+def _iter_lines(fp: IO, block_size: int) -> Iterator:
+    '''Yield the lines in fp that are not blank, reading block_size at a time.
+
+    Lines are split on newlines only, and any carriage return left at the end is whitespace to json.'''
+    remainder = None
+
+    while True:
+        block = fp.read(block_size)
+
+        if not block:
+            break
+
+        if remainder:
+            block = remainder + block
+
+        lines = block.split(b'\n' if isinstance(block, bytes) else '\n')
+        # the last line goes on in the next block, or is empty if the block ended with a newline
+        remainder = lines.pop()
+
+        for line in lines:
+            if line and not line.isspace():
+                yield line
+
+    if remainder and not remainder.isspace():
+        yield remainder
+
+
+# decoders by the numbers argument of loads
+_DECODERS = {
+    'float': json.JSONDecoder(),
+    'decimal': json.JSONDecoder(parse_float=Decimal),
+    'lazy_decimal': json.JSONDecoder(parse_float=LazyDecimal),
+}
+
+
+# integers outside [-2 ** 63, 2 ** 64) have at least 19 digits. Long fractions and
+# digits in strings match too, which only costs reading them with the json module.
+_LONG_NUMBER_RE = re.compile(r'[0-9]{19}')
+_LONG_NUMBER_BYTES_RE = re.compile(rb'[0-9]{19}')
+
+
+def _has_long_number(s: Union[str, bytes]) -> bool:
+    '''Return True if s has a run of digits that orjson may not read as an exact integer.'''
+    pattern = _LONG_NUMBER_RE if isinstance(s, str) else _LONG_NUMBER_BYTES_RE
+    return pattern.search(s) is not None
+
+
+def _get_decoder(numbers: str) -> json.JSONDecoder:
+    '''Return decoder for the numbers argument of loads.
+
+    Raise ValueError if there is none.'''
+    decoder = _DECODERS.get(numbers)
+
+    if decoder is None:
+        raise ValueError(f'numbers must be one of {", ".join(_DECODERS)}, not "{numbers}"')
+
+    return decoder
+
+
+def _stdlib_dumps_bytes(obj) -> bytes:
+    '''Serialize obj with the json module.'''
+    try:
+        return _STDLIB_ENCODER.encode(obj).encode('utf-8')
+    except UnicodeEncodeError:
+        return _STDLIB_ASCII_ENCODER.encode(obj).encode('ascii')
+
+
+# datetimes and dataclasses go through json_default, so they are serialized the same as by the json module
+_ORJSON_OPTIONS = 0 if orjson is None else orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+# orjson writes floats under 1e-4 or from 1e16 differently than float.__repr__,
+# as "1e16", "1.5e-7" or "0.00001", where repr gives "1e+16", "1.5e-07" or "1e-05".
+# Output with either form is encoded again by the json module. Exponents are matched up to
+# the end of the number, so hex strings like UUIDs rarely match, and those that do only cost the retry.
+_ORJSON_EXPONENT_RE = re.compile(rb'e-?[0-9]+(?:[,\]}]|$)')
+
+
+def _orjson_dumps_bytes(obj) -> bytes:
+    '''Serialize obj with orjson, falling back to the json module where their output would differ.
+
+    orjson raises for what it does not support that the json module does,
+    like non string dict keys and integers over 64 bits.'''
+    try:
+        encoded = orjson.dumps(obj, default=json_default, option=_ORJSON_OPTIONS)
+    except TypeError:
+        return _stdlib_dumps_bytes(obj)
+
+    if b'0.0000' in encoded or _ORJSON_EXPONENT_RE.search(encoded):
+        return _stdlib_dumps_bytes(obj)
+
+    return encoded
@@ -4,7 +4,28 @@ Module for dealing with JWT tokens.
 '''
 
 import base64
-import json
+import hashlib
+import hmac
+import re
+import threading
+import time
+from collections import OrderedDict, abc
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from python_utils.iterable_utils import parallel_map
+from python_utils.json_utils import loads
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding, rsa
+except ImportError:
+    rsa = None
+
+
+class InvalidJwt(Exception):
+    '''Exception to raise if a jwt is malformed, expired, or its signature does not match.'''
 
 
 def get_jwt_token_components(encoded_jwt):
@@ -21,10 +42,365 @@ def get_jwt_token_components(encoded_jwt):
     }
 
 
+def get_cached_jwt_token_components(encoded_jwt: str) -> 'JwtComponents':
+    '''Return the components of the jwt from JWT_CACHE, see JwtCache.get.'''
+    return JWT_CACHE.get(encoded_jwt)
+
+
 def decode_jwt_component(encoded_jwt):
     '''Suffix encoded string with "=" signs, and base64 decode.'''
+    return loads(_b64decode(encoded_jwt))
+
+
+def _b64decode(encoded: str) -> bytes:
+    '''Base64 decode a url safe string, which jwts leave unpadded.'''
     # python b64 decoding requires the string have multiple of 4 chars in string,
     # so add "=" signs until it has enough chars
-    encoded_with_padding = encoded_jwt + '=' * (4 - len(encoded_jwt) % 4)
-    decoded = base64.urlsafe_b64decode(encoded_with_padding).decode('utf-8')
-    return json.loads(decoded)
+    return base64.urlsafe_b64decode(encoded + '=' * (4 - len(encoded) % 4))
+
+
+class JwtComponents(abc.Mapping):
+    '''Type, header, payload, and signature of a jwt, with the same keys as get_jwt_token_components.
+
+    The token is split when this is created, but the header and payload
+    are only decoded the first time they are read, so errors in them are raised then.
+
+    >>> components = JwtComponents('Bearer eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiJib2IifQ.c2ln')
+    >>> components['jwt_payload']
+    {'sub': 'bob'}
+    '''
+    # keys, which are also the names of the properties that return them
+    _KEYS = ('jwt_type', 'jwt_header', 'jwt_payload', 'jwt_signature')
+
+    def __init__(self, encoded_jwt: str):
+        self.jwt_type, jwt_string = encoded_jwt.split(' ')
+        self.encoded_header, self.encoded_payload, self.jwt_signature = jwt_string.split('.', 2)
+        self._header: Optional[dict] = None
+        self._payload: Optional[dict] = None
+
+    @property
+    def jwt_header(self) -> dict:
+        if self._header is None:
+            self._header = decode_jwt_component(self.encoded_header)
+
+        return self._header
+
+    @property
+    def jwt_payload(self) -> dict:
+        if self._payload is None:
+            self._payload = decode_jwt_component(self.encoded_payload)
+
+        return self._payload
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        '''Return the exp claim of the payload, or None if it does not have one.'''
+        return self.jwt_payload.get('exp')
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+
+class JwtCache:
+    '''Least recently used cache of JwtComponents, keyed on the raw token.
+
+    Holds at most maxsize tokens, and a token stops being returned from the cache
+    once the exp claim of its payload has passed, by clock.
+    Counts cache hits and misses, and is safe to use from multiple threads.'''
+
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, JwtComponents]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, encoded_jwt: str) -> JwtComponents:
+        '''Return the components of the jwt, from the cache if they are there and not expired.
+
+        Components for tokens that have expired are returned, but not cached.'''
+        components = self.peek(encoded_jwt)
+
+        if components is None:
+            components = JwtComponents(encoded_jwt)
+            self.put(encoded_jwt, components)
+
+        return components
+
+    def peek(self, encoded_jwt: str) -> Optional[JwtComponents]:
+        '''Return the cached components of the jwt, or None if they are not cached or have expired.'''
+        with self._lock:
+            components = self._entries.get(encoded_jwt)
+
+            if components is None or self._is_expired(components):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(encoded_jwt)
+            self.hits += 1
+            return components
+
+    def put(self, encoded_jwt: str, components: JwtComponents):
+        '''Cache the components of the jwt, unless they have expired.
+
+        The least recently used token is removed if there are more than maxsize.'''
+        # decodes the payload, so is done before taking the lock
+        is_expired = self._is_expired(components)
+
+        with self._lock:
+            if is_expired:
+                self._entries.pop(encoded_jwt, None)
+                return
+
+            self._entries[encoded_jwt] = components
+            self._entries.move_to_end(encoded_jwt)
+
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        '''Remove every token, and reset the hit and miss counts.'''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _is_expired(self, components: JwtComponents) -> bool:
+        expires_at = components.expires_at
+        return expires_at is not None and expires_at <= self.clock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# cache used by get_cached_jwt_token_components
+JWT_CACHE = JwtCache()
+
+
+# verifies a signature over the signing input of a jwt
+SignatureVerifier = Callable[[bytes, bytes], bool]
+
+
+# an unpadded base64url segment, checked before decoding,
+# as urlsafe_b64decode discards characters outside the alphabet instead of raising
+_SEGMENT_RE = re.compile(r'[A-Za-z0-9_-]*')
+
+
+def _verify_segments(components: JwtComponents):
+    '''Raise InvalidJwt unless the header, payload, and signature are the only segments, and are base64url.
+
+    A fourth segment is left in the signature by the split, so it is rejected here too.'''
+    for segment in (components.encoded_header, components.encoded_payload, components.jwt_signature):
+        if not _SEGMENT_RE.fullmatch(segment):
+            raise InvalidJwt('Malformed token')
+
+
+class JwkCache:
+    '''Keys to verify jwt signatures with, by key id, loaded from a JWKS dict or file.
+
+    Each key is decoded once, when it is loaded. HS256 keys have kty "oct",
+    and RS256 keys have kty "RSA", which need the cryptography package.
+
+    Raise ValueError if a key has a kty or alg that is not supported,
+    and ImportError if it is an RSA key and cryptography is not installed.'''
+
+    def __init__(self, jwks: Optional[dict] = None):
+        # key id -> (alg, verifier)
+        self._keys: Dict[Optional[str], Tuple[str, SignatureVerifier]] = {}
+
+        if jwks is not None:
+            self.load(jwks)
+
+    def load(self, jwks: dict):
+        '''Add the keys of a JWKS dict, replacing any with the same key id.'''
+        for jwk in jwks['keys']:
+            self._keys[jwk.get('kid')] = _load_jwk(jwk)
+
+    def load_file(self, path: str):
+        '''Add the keys of a JWKS json file, replacing any with the same key id.'''
+        with open(path, 'rb') as fp:
+            self.load(loads(fp.read()))
+
+    def get(self, kid: Optional[str]) -> Tuple[str, SignatureVerifier]:
+        '''Return the alg and verifier of the key with id kid.
+
+        A jwt without a key id can use the only key, if only one is loaded.
+
+        Raise InvalidJwt if there is no such key.'''
+        key = self._keys.get(kid)
+
+        if key is None and kid is None and len(self._keys) == 1:
+            key = next(iter(self._keys.values()))
+
+        if key is None:
+            raise InvalidJwt(f'No key with id "{kid}"')
+
+        return key
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class JwtVerifier:
+    '''Verifies the signatures and expiry of jwts, with keys from a JwkCache.
+
+    The header and payload decoded for JWT_CACHE are reused, and tokens that pass
+    are cached until their exp claim, so a token is only verified again once it drops out of the cache.
+    Tokens stay cached if keys are loaded later, so create a new JwtVerifier to revoke keys.
+
+    >>> secret = base64.urlsafe_b64encode(b'secret').decode()
+    >>> verifier = JwtVerifier(JwkCache({'keys': [{'kty': 'oct', 'k': secret, 'alg': 'HS256'}]}))
+    >>> token = ('Bearer eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiJib2IifQ.'
+    ...          'fUGhI2mOEisiffIkxW0-lYlrK6sEXB6SVSi1m5XmJjA')
+    >>> verifier.verify(token)['jwt_payload']
+    {'sub': 'bob'}
+    '''
+
+    def __init__(self, keys: JwkCache, maxsize: int = 1024, clock: Callable[[], float] = time.time):
+        self.keys = keys
+        self.clock = clock
+        self.verified = JwtCache(maxsize, clock)
+
+    def verify(self, encoded_jwt: str) -> JwtComponents:
+        '''Return the components of the jwt, if its signature matches its key and it has not expired.
+
+        Raise InvalidJwt if not, or if the jwt is malformed.'''
+        components = self.verified.peek(encoded_jwt)
+
+        if components is not None:
+            return components
+
+        try:
+            components = get_cached_jwt_token_components(encoded_jwt)
+            _verify_segments(components)
+            self._verify_signature(components)
+            self._verify_times(components)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise InvalidJwt('Malformed token') from e
+
+        self.verified.put(encoded_jwt, components)
+        return components
+
+    def verify_many(
+            self,
+            encoded_jwts: Iterable[str],
+            executor: Optional[Executor] = None,
+        ) -> Tuple[List[JwtComponents], Dict[int, InvalidJwt]]:
+        '''Verify each jwt, on executor if it is set, which should be a ThreadPoolExecutor.
+
+        Return the components of the jwts that passed, in order,
+        and the InvalidJwt errors of those that did not, by index.'''
+        if executor is None:
+            results = map(self._verify_or_error, encoded_jwts)
+        else:
+            results = parallel_map(self._verify_or_error, encoded_jwts, executor)
+
+        verified = []
+        errors = {}
+
+        for index, result in enumerate(results):
+            if isinstance(result, InvalidJwt):
+                errors[index] = result
+            else:
+                verified.append(result)
+
+        return verified, errors
+
+    def _verify_or_error(self, encoded_jwt: str) -> Union[JwtComponents, InvalidJwt]:
+        try:
+            return self.verify(encoded_jwt)
+        except InvalidJwt as e:
+            return e
+
+    def _verify_signature(self, components: JwtComponents):
+        '''Raise InvalidJwt if the signature of the jwt does not match its key.'''
+        header = components.jwt_header
+        alg, verifier = self.keys.get(header.get('kid'))
+
+        # checked against the key, so a token cannot pick a weaker alg, or "none"
+        if header.get('alg') != alg:
+            raise InvalidJwt(f'Token alg "{header.get("alg")}" does not match key alg "{alg}"')
+
+        signing_input = f'{components.encoded_header}.{components.encoded_payload}'.encode('ascii')
+
+        if not verifier(signing_input, _b64decode(components.jwt_signature)):
+            raise InvalidJwt('Signature does not match')
+
+    def _verify_times(self, components: JwtComponents):
+        '''Raise InvalidJwt if the jwt has expired, or is not valid yet.'''
+        payload = components.jwt_payload
+        now = self.clock()
+
+        if 'exp' in payload and payload['exp'] <= now:
+            raise InvalidJwt('Token has expired')
+
+        if 'nbf' in payload and payload['nbf'] > now:
+            raise InvalidJwt('Token is not valid yet')
+
+
+def _load_jwk(jwk: dict) -> Tuple[str, SignatureVerifier]:
+    '''Return the alg and verifier for a JWK.
+
+    Raise ValueError if its kty or alg is not supported.'''
+    load = _JWK_LOADERS.get(jwk.get('kty'))
+
+    if load is None:
+        raise ValueError(f'Unsupported key type "{jwk.get("kty")}"')
+
+    alg, verifier = load(jwk)
+
+    if jwk.get('alg', alg) != alg:
+        raise ValueError(f'Unsupported alg "{jwk["alg"]}" for key type "{jwk["kty"]}"')
+
+    return alg, verifier
+
+
+def _load_hmac_jwk(jwk: dict) -> Tuple[str, SignatureVerifier]:
+    '''Return the alg and verifier for an HS256 JWK.'''
+    secret = _b64decode(jwk['k'])
+
+    def verify_hs256(signing_input: bytes, signature: bytes) -> bool:
+        expected = hmac.new(secret, signing_input, hashlib.sha256).digest()
+        return hmac.compare_digest(expected, signature)
+
+    return 'HS256', verify_hs256
+
+
+def _load_rsa_jwk(jwk: dict) -> Tuple[str, SignatureVerifier]:
+    '''Return the alg and verifier for an RS256 JWK.
+
+    Raise ImportError if cryptography is not installed.'''
+    if rsa is None:
+        raise ImportError('The cryptography package is needed for RSA keys')
+
+    public_key = rsa.RSAPublicNumbers(
+        int.from_bytes(_b64decode(jwk['e']), 'big'),
+        int.from_bytes(_b64decode(jwk['n']), 'big'),
+    ).public_key()
+
+    def verify_rs256(signing_input: bytes, signature: bytes) -> bool:
+        try:
+            public_key.verify(signature, signing_input, padding.PKCS1v15(), hashes.SHA256())
+        except InvalidSignature:
+            return False
+
+        return True
+
+    return 'RS256', verify_rs256
+
+
+# loaders of JWKs by kty
+_JWK_LOADERS: Dict[str, Callable[[dict], Tuple[str, SignatureVerifier]]] = {
+    'oct': _load_hmac_jwk,
+    'RSA': _load_rsa_jwk,
+}
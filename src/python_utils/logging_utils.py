@@ -6,14 +6,154 @@ This file should be imported/called before any other modules that use any loggin
 If any other modules that use logging are imported before this file,
 then any calls to the logging module will not be formatted properly.
 '''
+import atexit
+import json
 import logging
+import queue
+import time
+from collections import abc
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Tuple
 
+from python_utils.json_utils import dumps, json_default
 
-def initialize_logger(log_level: str, remove_existing_handlers=False):
+LOG_FORMAT = '%(levelname)-8s - %(asctime)s - %(name)s - %(message)s'
+
+# default number of records the queue holds, when logging through a queue
+DEFAULT_QUEUE_SIZE = 10000
+
+# listener writing records from the queue, when logging through a queue
+_QUEUE_LISTENER: Optional[QueueListener] = None
+
+
+class BoundedQueueHandler(QueueHandler):
+    '''Handler that puts records on a bounded queue, for a QueueListener to write on another thread.
+
+    If the queue is full, either wait for room, or drop the record and count it in dropped.'''
+
+    def __init__(self, log_queue: queue.Queue, block_when_full: bool = False):
+        super().__init__(log_queue)
+        self.block_when_full = block_when_full
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.block_when_full:
+            self.queue.put(record)
+            return
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    '''Formatter that writes each record as a line of json.
+
+    Every line has level, time, logger, and message fields, followed by any extra fields,
+    and exception and stack fields if the record has them. Values are serialized by json_utils.dumps,
+    or as their repr if it cannot serialize them.
+    If a log call's only argument is a dict, and the message has no % in it, the dict's items
+    are added as fields, instead of the message being %-formatted with them.
+    Otherwise, like logger.info('Payload: %s', payload), the message is formatted as usual.
+    Fields with the same name as an earlier field are left out.
+
+    >>> record = logging.LogRecord('app', logging.INFO, 'app.py', 1, 'paid', ({'amount': 5},), None)
+    >>> record.created, record.msecs = 1600000000.0, 250
+    >>> JsonFormatter().format(record)
+    '{"level":"INFO","time":"2020-09-13T12:26:40.250Z","logger":"app","message":"paid","amount":5}'
+    '''
+    # attributes of every LogRecord, so not extra fields
+    _RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def __init__(self):
+        super().__init__()
+        # second and its formatted time, in one attribute so threads never see them out of step
+        self._cached_second: Tuple[int, str] = (-1, '')
+
+    def format(self, record: logging.LogRecord) -> str:
+        args = record.args
+        structured = isinstance(args, abc.Mapping) and isinstance(record.msg, str) and '%' not in record.msg
+
+        fields = {
+            'level': record.levelname,
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'message': record.msg if structured else record.getMessage(),
+        }
+
+        if structured:
+            for key, value in args.items():
+                fields.setdefault(key, value)
+
+        attributes = vars(record)
+        extra = attributes.keys() - self._RECORD_ATTRIBUTES
+
+        if extra:
+            # walk the record rather than the set, to keep the order extra fields were given in
+            for key, value in attributes.items():
+                if key in extra:
+                    fields.setdefault(key, value)
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+
+        if record.exc_text:
+            fields['exception'] = record.exc_text
+
+        if record.stack_info:
+            fields['stack'] = self.formatStack(record.stack_info)
+
+        try:
+            return dumps(fields)
+        except (TypeError, ValueError):
+            return json.dumps(fields, separators=(',', ':'), ensure_ascii=False, default=_json_default_or_repr)
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        '''Return the iso 8601 utc time of the record, formatting each second only once.'''
+        second = int(record.created)
+        cached_second, formatted = self._cached_second
+
+        if second != cached_second:
+            formatted = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+            self._cached_second = (second, formatted)
+
+        return f'{formatted}.{int(record.msecs):03d}Z'
+
+
+def _json_default_or_repr(obj):
+    '''Custom default func for json.dumps that falls back on repr, so a log line is always written.'''
+    try:
+        return json_default(obj)
+    except TypeError:
+        return repr(obj)
+
+
+def initialize_logger(
+        log_level: str,
+        remove_existing_handlers=False,
+        use_queue=False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        block_when_full=False,
+        json_format=False,
+    ):
     '''Set logging level to the level specified in environment, and set formatting.
 
-    Default to "INFO" if an invalid log_level value specified.'''
+    Default to "INFO" if an invalid log_level value specified.
+
+    If use_queue is set, log calls only put records on a queue of up to queue_size records,
+    and a background thread writes them. When the queue is full, records are dropped,
+    or if block_when_full is set, log calls wait for room.
+    Records left on the queue are written at exit. Call flush_logs, or decorate the handler
+    with flush_logs_after, to write them before a lambda invocation returns.
+    Handlers already on the root logger, like the one lambda adds, are moved behind the queue,
+    and keep formatting lines their own way. Set remove_existing_handlers to write
+    to stderr in LOG_FORMAT or as json instead.
+
+    If json_format is set, lines are written as json by JsonFormatter, instead of in LOG_FORMAT.
+    Like LOG_FORMAT, it is only used if the root logger has no handlers.'''
     # Note, do NOT do any logging in this function until the "basicConfig" is set!
     unable_to_set_user_log_level = False
 
@@ -28,10 +168,17 @@ def initialize_logger(log_level: str, remove_existing_handlers=False):
         unable_to_set_user_log_level = True
         logging_level = logging.INFO
 
-    logging.basicConfig(
-        level=logging_level,
-        format='%(levelname)-8s - %(asctime)s - %(name)s - %(message)s',
-    )
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+
+    if use_queue and _QUEUE_LISTENER is None:
+        _start_queue_listener(logging_level, queue_size, block_when_full, formatter)
+    else:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        logging.basicConfig(
+            level=logging_level,
+            handlers=[stream_handler],
+        )
 
     logging.info('Logger initialized! Threshold set to "%s".',
                  logging.getLevelName(logging_level))
@@ -45,21 +192,108 @@ def remove_handlers():
     '''Unset handlers, so our custom log level will work.
 
     The following is a hack to get around the fact that AWS is setting
-    log handlers without asking us, which prevents us from changing the level.'''
+    log handlers without asking us, which prevents us from changing the level.
+    Stops the queue listener, if logging through a queue, once it has written every record.'''
+    _stop_queue_listener()
+
     root = logging.getLogger()
     if root.handlers:
         for handler in root.handlers:
             root.removeHandler(handler)
 
+
+def flush_logs():
+    '''Wait until every record logged so far has been written, and flush the handlers.'''
+    if _QUEUE_LISTENER is not None:
+        _QUEUE_LISTENER.queue.join()
+
+        for handler in _QUEUE_LISTENER.handlers:
+            handler.flush()
+
+    for handler in logging.root.handlers:
+        handler.flush()
+
+
+def flush_logs_after(func):
+    '''Decorator to flush logs when a lambda handler returns or raises.
+
+    Lambda can freeze the container as soon as the handler returns,
+    so records still on the queue might not be written until the next invocation.'''
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            flush_logs()
+
+    return wrapper
+
+
+def _start_queue_listener(
+        logging_level: int,
+        queue_size: int,
+        block_when_full: bool,
+        formatter: logging.Formatter,
+    ):
+    '''Log through a BoundedQueueHandler on the root logger, with a QueueListener writing the records.
+
+    The listener writes to the handlers already on the root logger, or else to stderr.'''
+    global _QUEUE_LISTENER
+
+    root = logging.getLogger()
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    queue_handler = BoundedQueueHandler(log_queue, block_when_full)
+    existing_handlers = list(root.handlers)
+
+    if existing_handlers:
+        # only the message is formatted before it is queued, and the handlers format the rest of the line
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        target_handlers = existing_handlers
+
+        for handler in existing_handlers:
+            root.removeHandler(handler)
+    else:
+        # the whole line is formatted before it is queued, while the record's args and extra fields
+        # are still there, so the stream handler only writes it
+        queue_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter('%(message)s'))
+        target_handlers = [stream_handler]
+
+    _QUEUE_LISTENER = QueueListener(log_queue, *target_handlers, respect_handler_level=True)
+    _QUEUE_LISTENER.start()
+    logging.basicConfig(level=logging_level, handlers=[queue_handler])
+
+
+@atexit.register
+def _stop_queue_listener():
+    '''Stop the queue listener, if logging through a queue, once it has written every record.'''
+    global _QUEUE_LISTENER
+
+    if _QUEUE_LISTENER is not None:
+        # the listener is stopped by queueing a sentinel without blocking, so make room for it first
+        _QUEUE_LISTENER.queue.join()
+        _QUEUE_LISTENER.stop()
+        _QUEUE_LISTENER = None
+
 class LazyString(object):
-    '''Postpone function evaluation until it is stringified.'''
+    '''Postpone function evaluation until it is stringified.
+
+    The string is computed on the first str call, and reused after that,
+    so a record written by several handlers only calls func once.'''
+    __slots__ = ('func', 'args', 'kwargs', '_string')
 
-    def __init__(self, func, *args):
+    def __init__(self, func, *args, **kwargs):
         self.func = func
         self.args = args
+        self.kwargs = kwargs
+        self._string: Optional[str] = None
 
     def __str__(self):
-        return '{0}'.format(self.func(*self.args))
+        if self._string is None:
+            self._string = '{0}'.format(self.func(*self.args, **self.kwargs))
+
+        return self._string
 
 
 def lazy_evaluate_string(func):
@@ -68,8 +302,20 @@ def lazy_evaluate_string(func):
     Decorate function that returns string when using with logger.'''
 
     @wraps(func)
-    def wrapper(*args):
-        dm = LazyString(func, *args)
+    def wrapper(*args, **kwargs):
+        dm = LazyString(func, *args, **kwargs)
         return dm
 
     return wrapper
+
+
+def lazy_log(logger: logging.Logger, level: int, msg: str, func, *args, **kwargs):
+    '''Log msg formatted with the string returned by func(*args, **kwargs), if logger is enabled for level.
+
+    Unlike passing a lazy_evaluate_string result to the logger, nothing is built
+    when the level is disabled, and func is only called once the record is formatted.
+
+    >>> lazy_log(logging.getLogger('quiet'), logging.DEBUG, 'rows: %s', lambda rows: ', '.join(rows), ['a', 'b'])
+    '''
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, LazyString(func, *args, **kwargs), stacklevel=2)
@@ -2,9 +2,23 @@
 '''
 Module with functions to help with typing assertions.
 '''
+import sys
+import threading
+from functools import partial
+from types import MappingProxyType
 from typing import (
     Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Tuple,
     Type,
+    TypedDict,
     get_args,
     get_origin,
     get_type_hints,
@@ -23,6 +37,57 @@ def is_typed_dict(x: Union[Type, Any]) -> bool:
     return x.__class__.__name__ == '_TypedDictMeta'
 
 
+class TypedDictSchema(NamedTuple):
+    '''Resolved description of a TypedDict, including keys inherited from parent TypedDicts.'''
+    keys: Tuple[str, ...]
+    type_hints: Mapping[str, Any]
+    required_keys: FrozenSet[str]
+    optional_keys: FrozenSet[str]
+
+
+# Process wide registry of every TypedDict that has been resolved
+_TYPED_DICT_SCHEMAS: Dict[type, TypedDictSchema] = {}
+
+
+def get_typed_dict_schema(typed_dict: Type) -> TypedDictSchema:
+    '''Return the schema of a TypedDict, resolving it only the first time it is seen.
+
+    Raise TypeError if typed_dict is not a TypedDict.
+
+    Python 3.8 does not record which parent TypedDict a key came from, so there
+    a subclass lists its own keys first, and its "total" applies to inherited keys too.
+
+    >>> class TestType(TypedDict, total=False):
+    ...     field: float
+    >>> get_typed_dict_schema(TestType).optional_keys
+    frozenset({'field'})
+    '''
+    try:
+        return _TYPED_DICT_SCHEMAS[typed_dict]
+    except KeyError:
+        pass
+
+    if not is_typed_dict(typed_dict):
+        raise TypeError(f'{typed_dict} is not a TypedDict')
+
+    type_hints = get_type_hints(typed_dict)
+
+    # __required_keys__ was added in python 3.9, before that only the subclass's "total" is known,
+    # as 3.8 merges parent annotations into the subclass and drops its bases from __mro__
+    total = getattr(typed_dict, '__total__', True)
+    required_keys = getattr(typed_dict, '__required_keys__', frozenset(type_hints) if total else frozenset())
+
+    schema = TypedDictSchema(
+        keys=tuple(type_hints),
+        type_hints=MappingProxyType(type_hints),
+        required_keys=frozenset(required_keys),
+        optional_keys=frozenset(type_hints) - frozenset(required_keys),
+    )
+    _TYPED_DICT_SCHEMAS[typed_dict] = schema
+
+    return schema
+
+
 def is_generic_type(x):
     '''Return true if x is a generic type, like str, int, or dict.'''
     # complex types from the typing module do not allow isinstance() to be called on them
@@ -87,6 +152,8 @@ def verify_type(subject, expected_type: type, label: Optional[str]=None):
         list_element_data_type = get_args(expected_type)[0]
         if not isinstance(subject, list):
             raise _get_type_error(subject, (list,), label)
+        elif list_element_data_type in PRIMITIVE_TYPES:
+            _verify_primitive_elements(subject, list_element_data_type, label)
         else:
             for el in subject:
                 verify_type(el, list_element_data_type, f'item in {label}')
@@ -103,6 +170,73 @@ def verify_type(subject, expected_type: type, label: Optional[str]=None):
     check_multiple_types(subject, possible_types, label)
 
 
+# Builtin types that lists can be checked against in bulk, by the set of element types
+PRIMITIVE_TYPES = frozenset({int, float, complex, str, bytes, bool, type(None)})
+
+
+def _find_invalid_element(subject, element_type) -> int:
+    '''Return index of the first element of subject that is not element_type, or -1.
+
+    Only the distinct types found in subject are compared with element_type,
+    and subject is only searched element by element if one of them does not match.'''
+    if all(issubclass(_, element_type) for _ in set(map(type, subject))):
+        return -1
+
+    return next(index for index, el in enumerate(subject) if not isinstance(el, element_type))
+
+
+def _verify_primitive_elements(subject, element_type, label):
+    '''Raise TypeError for the first element of subject that is not element_type.'''
+    invalid_index = _find_invalid_element(subject, element_type)
+
+    if invalid_index != -1:
+        raise _get_type_error(subject[invalid_index], (element_type,), f'item in {label}')
+
+
+# numpy dtype kinds that hold values of each primitive type
+_NUMPY_DTYPE_KINDS = {
+    int: 'iu',
+    float: 'f',
+    complex: 'c',
+    bool: 'b',
+    str: 'U',
+    bytes: 'S',
+}
+
+
+def verify_homogeneous_list(subject, element_type: type, label: Optional[str]=None):
+    '''Raise error if subject is not a list or numpy array of element_type.
+
+    element_type must be in PRIMITIVE_TYPES. Lists are checked like verify_type checks List[element_type].
+    numpy arrays are checked by dtype, so that an int64 array is a valid array of int,
+    and arrays of objects are checked element by element like lists.
+
+    >>> verify_homogeneous_list([1, 2, 'three'], int, 'numbers')
+    Traceback (most recent call last):
+    ...
+    TypeError: ('must be int, not str', 'item in numbers')
+    '''
+    if element_type not in PRIMITIVE_TYPES:
+        raise TypeError(f'{element_type} is not a primitive type')
+
+    # numpy is optional, and a subject can only be an array if numpy is already imported
+    np = sys.modules.get('numpy')
+
+    if np is not None and isinstance(subject, np.ndarray):
+        if subject.dtype.kind == 'O':
+            return _verify_primitive_elements(subject.ravel(), element_type, label)
+
+        if subject.dtype.kind not in _NUMPY_DTYPE_KINDS.get(element_type, ''):
+            raise TypeError(f'must be {element_type.__name__}, not {subject.dtype}', f'item in {label}')
+
+        return
+
+    if not isinstance(subject, list):
+        raise _get_type_error(subject, (list,), label)
+
+    _verify_primitive_elements(subject, element_type, label)
+
+
 def _get_type_error(subject, possible_types, label):
     '''Helper func for verify_type() to raise proper type error.'''
     if len(possible_types) > 1:
@@ -139,7 +273,7 @@ def _verify_typed_dict(subject, expected_type: Type, label: Optional[str]=None):
     if not isinstance(subject, dict):
         raise _get_type_error(subject, (expected_type,), label)
 
-    typed_dict_fields = get_type_hints(expected_type)
+    typed_dict_fields = get_typed_dict_schema(expected_type).type_hints
 
     for key, key_type in typed_dict_fields.items():
         if key not in subject:
@@ -165,3 +299,437 @@ def check_multiple_types(subject, possible_types, label):
 
     if found_exception is not None:
         raise _get_type_error(subject, possible_types, label)
+
+
+# A compiled validator takes the subject and its label, and raises like verify_type
+Validator = Callable[..., None]
+
+# Process wide cache of compiled validators by expected type
+_VALIDATORS: Dict[Any, Validator] = {}
+
+
+def compile_validator(expected_type) -> Validator:
+    '''Return a function that verifies subjects against expected_type, like verify_type.
+
+    The shape of expected_type is only worked out once, into a tree of functions,
+    and the result is cached per type. The returned function takes (subject, label=None)
+    and raises exactly the same TypeError and KeyError as verify_type.
+
+    >>> class TestType(TypedDict):
+    ...     field: float
+    >>> validate = compile_validator(List[TestType])
+    >>> validate([{'field': 'invalid'}], 'body')
+    Traceback (most recent call last):
+    ...
+    TypeError: ('must be float, not str', 'field')
+    '''
+    return _compile(expected_type, _VALIDATORS, _build_validator)
+
+
+# Held while building, so threads never see a cache holding functions that are still being built.
+# Reentrant, as builders compile the types inside expected_type.
+_COMPILE_LOCK = threading.RLock()
+
+# Functions built so far by the outermost _compile on each cache, by id of the cache,
+# which are only added to the cache once the whole build succeeds
+_PENDING: Dict[int, Dict[Any, Callable]] = {}
+
+
+def _compile(expected_type, cache: Dict[Any, Callable], build: Callable[[Any], Callable]) -> Callable:
+    '''Return the function build makes for expected_type, caching it in cache.'''
+    try:
+        return cache[expected_type]
+    except KeyError:
+        pass
+
+    with _COMPILE_LOCK:
+        # another thread may have built it while this one waited
+        if expected_type in cache:
+            return cache[expected_type]
+
+        pending = _PENDING.get(id(cache))
+
+        if pending is not None:
+            return _build_pending(expected_type, pending, build)
+
+        pending = _PENDING[id(cache)] = {}
+
+        try:
+            func = _build_pending(expected_type, pending, build)
+            cache.update(pending)
+        finally:
+            del _PENDING[id(cache)]
+
+        return func
+
+
+def _build_pending(expected_type, pending: Dict[Any, Callable], build: Callable[[Any], Callable]) -> Callable:
+    '''Return the function build makes for expected_type, adding it and the functions built for it to pending.
+
+    If build raises, everything it added to pending is removed, so no function
+    is left forwarding to a function that was never built.'''
+    try:
+        return pending[expected_type]
+    except KeyError:
+        pass
+
+    # Forward to the real function, so self referencing TypedDicts can be compiled
+    compiled: list = []
+
+    def forward(*args):
+        return compiled[0](*args)
+
+    pending_count = len(pending)
+    pending[expected_type] = forward
+
+    try:
+        func = build(expected_type)
+    except Exception:
+        for key in list(pending)[pending_count:]:
+            del pending[key]
+        raise
+
+    compiled.append(func)
+    pending[expected_type] = func
+
+    return func
+
+
+def _build_validator(expected_type) -> Validator:
+    '''Build validator for compile_validator, following the same rules as verify_type.'''
+    if is_generic_type(expected_type):
+        return _build_generic_validator(expected_type)
+
+    if is_specified_dict(expected_type):
+        return _build_specified_dict_validator(expected_type)
+
+    if is_typed_dict(expected_type):
+        return _build_typed_dict_validator(expected_type)
+
+    if is_list_with_specified_data_type(expected_type):
+        return _build_list_validator(expected_type)
+
+    if get_origin(expected_type) == Union:
+        return _build_union_validator(expected_type)
+
+    raise TypeError(f'Cannot build validator for type {expected_type}')
+
+
+def _build_generic_validator(expected_type) -> Validator:
+    possible_types = (expected_type,)
+
+    def validate(subject, label=None):
+        if not isinstance(subject, expected_type):
+            raise _get_type_error(subject, possible_types, label)
+
+    return validate
+
+
+def _build_specified_dict_validator(expected_type) -> Validator:
+    possible_types = (expected_type,)
+    key_type, val_type = get_args(expected_type)
+    validate_key = compile_validator(key_type)
+    validate_val = compile_validator(val_type)
+
+    def validate(subject, label=None):
+        if not isinstance(subject, dict):
+            raise _get_type_error(subject, possible_types, label)
+
+        for key, val in subject.items():
+            validate_key(key, key)
+            validate_val(val, val)
+
+    return validate
+
+
+def _build_typed_dict_validator(expected_type) -> Validator:
+    possible_types = (expected_type,)
+    fields = tuple(
+        (key, compile_validator(key_type))
+        for key, key_type in get_typed_dict_schema(expected_type).type_hints.items()
+    )
+
+    def validate(subject, label=None):
+        if not isinstance(subject, dict):
+            raise _get_type_error(subject, possible_types, label)
+
+        for key, validate_field in fields:
+            if key not in subject:
+                raise KeyError(key)
+
+            validate_field(subject[key], key)
+
+    return validate
+
+
+def _build_list_validator(expected_type) -> Validator:
+    element_type = get_args(expected_type)[0]
+
+    if element_type in PRIMITIVE_TYPES:
+        def validate_primitives(subject, label=None):
+            if not isinstance(subject, list):
+                raise _get_type_error(subject, (list,), label)
+
+            _verify_primitive_elements(subject, element_type, label)
+
+        return validate_primitives
+
+    validate_element = compile_validator(element_type)
+
+    def validate(subject, label=None):
+        if not isinstance(subject, list):
+            raise _get_type_error(subject, (list,), label)
+
+        item_label = f'item in {label}'
+
+        for el in subject:
+            validate_element(el, item_label)
+
+    return validate
+
+
+def _build_union_validator(expected_type) -> Validator:
+    possible_types = get_args(expected_type)
+
+    # members that are plain classes can all be checked with one isinstance call
+    plain_types = tuple(_ for _ in possible_types if is_generic_type(_))
+    other_validators = tuple(compile_validator(_) for _ in possible_types if not is_generic_type(_))
+
+    def validate(subject, label=None):
+        if isinstance(subject, plain_types):
+            return
+
+        for validate_member in other_validators:
+            try:
+                validate_member(subject, label)
+                return
+            except (TypeError, KeyError):
+                pass
+
+        raise _get_type_error(subject, possible_types, label)
+
+    return validate
+
+
+def is_instance_of(subject, expected_type) -> bool:
+    '''Return True if subject is of expected_type, following the same rules as verify_type.
+
+    Unlike verify_type, no exceptions are raised or caught while checking,
+    which makes this much faster when many subjects are not valid.
+
+    >>> is_instance_of({'a': [1, 2]}, Dict[str, List[int]])
+    True
+    >>> is_instance_of({'a': [1, 'b']}, Dict[str, List[int]])
+    False
+    '''
+    return _compile(expected_type, _PREDICATES, _build_predicate)(subject)
+
+
+def filter_valid(subjects: Iterable, expected_type) -> Iterator:
+    '''Lazily yield only the subjects that are of expected_type.'''
+    return filter(_compile(expected_type, _PREDICATES, _build_predicate), subjects)
+
+
+# A predicate takes the subject, and returns whether it is of the expected type
+Predicate = Callable[[Any], bool]
+
+# Process wide cache of compiled predicates by expected type
+_PREDICATES: Dict[Any, Predicate] = {}
+
+
+def _build_predicate(expected_type) -> Predicate:
+    '''Build predicate for is_instance_of, following the same rules as verify_type.'''
+    if is_generic_type(expected_type):
+        return lambda subject: isinstance(subject, expected_type)
+
+    if is_specified_dict(expected_type):
+        key_type, val_type = get_args(expected_type)
+        key_is_valid = _compile(key_type, _PREDICATES, _build_predicate)
+        val_is_valid = _compile(val_type, _PREDICATES, _build_predicate)
+
+        return lambda subject: (
+            isinstance(subject, dict)
+            and all(map(key_is_valid, subject.keys()))
+            and all(map(val_is_valid, subject.values()))
+        )
+
+    if is_typed_dict(expected_type):
+        fields = tuple(
+            (key, _compile(key_type, _PREDICATES, _build_predicate))
+            for key, key_type in get_typed_dict_schema(expected_type).type_hints.items()
+        )
+
+        return lambda subject: (
+            isinstance(subject, dict)
+            and all(key in subject and is_valid(subject[key]) for key, is_valid in fields)
+        )
+
+    if is_list_with_specified_data_type(expected_type):
+        element_type = get_args(expected_type)[0]
+
+        if element_type in PRIMITIVE_TYPES:
+            return lambda subject: isinstance(subject, list) and _find_invalid_element(subject, element_type) == -1
+
+        element_is_valid = _compile(element_type, _PREDICATES, _build_predicate)
+
+        return lambda subject: isinstance(subject, list) and all(map(element_is_valid, subject))
+
+    if get_origin(expected_type) == Union:
+        return _build_union_predicate(get_args(expected_type))
+
+    raise TypeError(f'Cannot build predicate for type {expected_type}')
+
+
+def _build_union_predicate(possible_types: tuple) -> Predicate:
+    '''Build predicate that only checks the members of a Union that can accept the subject's type.'''
+    # members that are plain classes can all be checked with one isinstance call
+    plain_types = tuple(_ for _ in possible_types if is_generic_type(_))
+
+    # other members with the class a subject must be an instance of for them to accept it
+    members = tuple(
+        (_get_container_class(_), _compile(_, _PREDICATES, _build_predicate))
+        for _ in possible_types if not is_generic_type(_)
+    )
+
+    # Cache of member predicates that can accept each concrete type
+    candidates_by_type: Dict[type, Tuple[Predicate, ...]] = {}
+
+    def is_valid(subject) -> bool:
+        if isinstance(subject, plain_types):
+            return True
+
+        subject_type = type(subject)
+        candidates = candidates_by_type.get(subject_type)
+
+        if candidates is None:
+            candidates = candidates_by_type[subject_type] = tuple(
+                predicate for container_class, predicate in members
+                if container_class is None or issubclass(subject_type, container_class)
+            )
+
+        for predicate in candidates:
+            if predicate(subject):
+                return True
+
+        return False
+
+    return is_valid
+
+
+def _get_container_class(expected_type) -> Optional[type]:
+    '''Return dict or list if every subject of expected_type must be one, or None if unknown.'''
+    if is_specified_dict(expected_type) or is_typed_dict(expected_type):
+        return dict
+
+    if is_list_with_specified_data_type(expected_type):
+        return list
+
+    return None
+
+
+class RecordError(TypedDict):
+    '''Description of one field in a batch of records that is not the expected type.'''
+    index: int  # index of the record in the batch
+    path: str  # JSON path to the field within the record, like $.items[2].price
+    expected: str
+    actual: str  # type name of the value found, or "missing" for missing keys
+
+
+class _ErrorLimitReached(Exception):
+    '''Raised internally once validate_batch has collected max_errors errors.'''
+
+
+def validate_batch(records: Iterable, expected_type, max_errors: Optional[int] = 100) -> List[RecordError]:
+    '''Return errors for every field in records that is not of expected_type.
+
+    Follows the same rules as verify_type, but collects every error in one pass
+    instead of raising on the first. Valid records are only checked with is_instance_of.
+    Stop as soon as max_errors errors are found; pass None to collect all errors.
+
+    Raise ValueError if max_errors is less than 1.
+
+    >>> validate_batch([1, 'a', 2.5], int)
+    [{'index': 1, 'path': '$', 'expected': 'int', 'actual': 'str'}, {'index': 2, 'path': '$', 'expected': 'int', 'actual': 'float'}]
+    '''
+    if max_errors is not None and max_errors < 1:
+        raise ValueError(f'max_errors must be at least 1, not {max_errors}')
+
+    is_valid = _compile(expected_type, _PREDICATES, _build_predicate)
+    errors: List[RecordError] = []
+
+    def add_error(index, path, expected, actual):
+        errors.append({'index': index, 'path': path, 'expected': expected, 'actual': actual})
+
+        if max_errors is not None and len(errors) >= max_errors:
+            raise _ErrorLimitReached
+
+    try:
+        for index, record in enumerate(records):
+            if not is_valid(record):
+                _collect_errors(record, expected_type, '$', partial(add_error, index))
+    except _ErrorLimitReached:
+        pass
+
+    return errors
+
+
+def _collect_errors(subject, expected_type, path: str, add_error: Callable[[str, str, str], None]):
+    '''Call add_error(path, expected, actual) for every part of subject that is not of expected_type.'''
+    if is_generic_type(expected_type) or get_origin(expected_type) == Union:
+        # Which member of a Union was meant is ambiguous, so only report the Union itself
+        if not _compile(expected_type, _PREDICATES, _build_predicate)(subject):
+            add_error(path, _describe_type(expected_type), type(subject).__name__)
+        return
+
+    if is_specified_dict(expected_type) or is_typed_dict(expected_type):
+        if not isinstance(subject, dict):
+            add_error(path, _describe_type(expected_type), type(subject).__name__)
+            return
+
+    if is_specified_dict(expected_type):
+        key_type, val_type = get_args(expected_type)
+        for key, val in subject.items():
+            _collect_if_invalid(key, key_type, f'{path}.{key}', add_error)
+            _collect_if_invalid(val, val_type, f'{path}.{key}', add_error)
+        return
+
+    if is_typed_dict(expected_type):
+        for key, key_type in get_typed_dict_schema(expected_type).type_hints.items():
+            if key not in subject:
+                add_error(f'{path}.{key}', _describe_type(key_type), 'missing')
+            else:
+                _collect_if_invalid(subject[key], key_type, f'{path}.{key}', add_error)
+        return
+
+    if is_list_with_specified_data_type(expected_type):
+        if not isinstance(subject, list):
+            add_error(path, _describe_type(expected_type), type(subject).__name__)
+            return
+
+        element_type = get_args(expected_type)[0]
+        for index, el in enumerate(subject):
+            _collect_if_invalid(el, element_type, f'{path}[{index}]', add_error)
+        return
+
+    raise TypeError(f'Cannot validate type {expected_type}')
+
+
+def _collect_if_invalid(subject, expected_type, path: str, add_error: Callable[[str, str, str], None]):
+    '''Only walk subject for errors if it is not of expected_type.'''
+    if not _compile(expected_type, _PREDICATES, _build_predicate)(subject):
+        _collect_errors(subject, expected_type, path, add_error)
+
+
+def _describe_type(expected_type) -> str:
+    '''Return a readable name for expected_type, like List[str] or float | NoneType.'''
+    if get_origin(expected_type) == Union:
+        return ' | '.join(_describe_type(_) for _ in get_args(expected_type))
+
+    if is_list_with_specified_data_type(expected_type):
+        return f'List[{_describe_type(get_args(expected_type)[0])}]'
+
+    if is_specified_dict(expected_type):
+        key_type, val_type = get_args(expected_type)
+        return f'Dict[{_describe_type(key_type)}, {_describe_type(val_type)}]'
+
+    return getattr(expected_type, '__name__', str(expected_type))
@@ -0,0 +1,74 @@
+import json
+import logging
+
+import pytest
+
+from aws_utils import boto_utils
+from aws_utils.boto_utils import (
+    batch_parameter_sets,
+    convert_to_parameter_set,
+    convert_to_parameter_sets,
+    estimate_parameter_set_size,
+    log_sql_statements,
+)
+
+
+def test_estimate_parameter_set_size():
+    parameter_set = convert_to_parameter_set({
+        'id': 123,
+        'name': 'Zoë "the" driver',
+        'score': 0.1,
+        'active': False,
+        'deleted_at': None,
+    })
+
+    assert estimate_parameter_set_size(parameter_set) == len(json.dumps(parameter_set))
+    assert estimate_parameter_set_size([]) == len(json.dumps([]))
+
+
+def test_batch_parameter_sets():
+    parameter_sets = [convert_to_parameter_set({'id': i, 'name': 'x' * i}) for i in range(50)]
+    max_bytes = 1000
+
+    batches = list(batch_parameter_sets(iter(parameter_sets), 10, max_bytes))
+
+    assert [ps for batch in batches for ps in batch] == parameter_sets
+    assert all(len(batch) <= 10 for batch in batches)
+    assert all(len(json.dumps(batch)) <= max_bytes for batch in batches)
+
+    # each batch is as full as possible, so adding the next set would go over a limit
+    for batch, next_batch in zip(batches, batches[1:]):
+        assert len(batch) == 10 or len(json.dumps(batch + next_batch[:1])) > max_bytes
+
+
+def test_batch_parameter_sets_too_large():
+    parameter_sets = [convert_to_parameter_set({'name': 'x' * 100})]
+
+    with pytest.raises(ValueError):
+        list(batch_parameter_sets(parameter_sets, 10, 50))
+
+
+def test_log_sql_statements(monkeypatch):
+    sql = 'INSERT INTO people (id) VALUES (:id) ;'
+    parameter_sets = convert_to_parameter_sets([{'id': 1}, {'id': 2}])
+    calls = []
+    monkeypatch.setattr(boto_utils, 'interpolate_batch_sql', lambda *args: calls.append(args) or ['sql'])
+
+    messages = []
+    handler = logging.Handler()
+    handler.emit = lambda record: messages.append(record.getMessage())
+    boto_utils.logger.addHandler(handler)
+
+    try:
+        boto_utils.logger.setLevel(logging.INFO)
+        log_sql_statements(sql, parameter_sets)
+        assert calls == []
+
+        boto_utils.logger.setLevel(logging.DEBUG)
+        log_sql_statements(sql, parameter_sets)
+    finally:
+        boto_utils.logger.removeHandler(handler)
+        boto_utils.logger.setLevel(logging.NOTSET)
+
+    assert messages == ['sql']
+    assert len(calls) == 1
@@ -0,0 +1,24 @@
+'''
+Test that the http request tools work.
+'''
+from decimal import Decimal
+
+import pytest
+
+from aws_utils.http_exceptions import BadRequest
+from aws_utils.http_request import get_body_from_post_request
+
+
+def test_get_body_from_post_request():
+    event = {'body': '{"price": 5.10, "name": "Bob"}'}
+
+    assert get_body_from_post_request(event) == {'price': 5.1, 'name': 'Bob'}
+    assert get_body_from_post_request(event, numbers='decimal') == {'price': Decimal('5.10'), 'name': 'Bob'}
+
+    big_int = {'body': '{"id": 123456789012345678901234567890}'}
+    assert get_body_from_post_request(big_int) == {'id': 123456789012345678901234567890}
+
+
+def test_get_body_from_post_request_malformed():
+    with pytest.raises(BadRequest):
+        get_body_from_post_request({'body': '{"price": '})
@@ -2,8 +2,13 @@
 Test that the http response tools work.
 '''
 import json
+from decimal import Decimal
 
-from aws_utils.http_response import handle_exceptions
+import pytest
+
+from aws_utils.http_exceptions import ResponseTooLarge
+from aws_utils.http_response import handle_exceptions, streamed_success_response, success_response
+from python_utils.json_utils import decimal_default
 
 def test_handle_exceptions():
     @handle_exceptions
@@ -14,3 +19,29 @@ def test_handle_exceptions():
     body = json.loads(res.get('body'))
     assert body['code'] == 500
     assert body['message'] == 'unhandled internal error'
+
+
+def test_success_response():
+    '''The body is the same as json.dumps with decimal_default writes, even for lone surrogates.'''
+    payload = {'price': Decimal('5.5'), 'name': 'Zoë', 'raw': '\ud800'}
+
+    res = success_response(payload)
+
+    assert res['statusCode'] == 200
+    assert res['body'] == json.dumps(payload, default=decimal_default)
+    assert res['body'] == '{"price": 5.5, "name": "Zo\\u00eb", "raw": "\\ud800"}'
+
+
+def test_streamed_success_response():
+    payload = {'items': [{'price': Decimal('5.5')}] * 1000}
+
+    res = streamed_success_response(payload)
+
+    assert res == success_response(payload)
+
+
+def test_streamed_success_response_too_large():
+    payload = {'items': [{'price': Decimal('5.5')}] * 1000}
+
+    with pytest.raises(ResponseTooLarge):
+        streamed_success_response(payload, max_body_size=1000)
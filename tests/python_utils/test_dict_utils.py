@@ -3,9 +3,24 @@
 Module to verify iterable utils work.
 '''
 
+from collections import defaultdict, namedtuple
+from types import MappingProxyType
+from typing import TypedDict
+
 import pytest
 
-from python_utils.dict_utils import coerce_datatypes
+from python_utils.dict_utils import (
+    BiDict,
+    KeyProjector,
+    coerce_datatypes,
+    compile_converter,
+    dict_with_required_keys,
+    get_key_by_val,
+    get_keys_from_typed_dict,
+    replace_keys,
+    trim_records,
+    trim_values,
+)
 
 
 datatype_map = {
@@ -100,3 +115,178 @@ def test_coerce_datatypes_error_3():
         coerce_datatypes(datatype_map, data_to_coerce)
 
     assert err.value.args[1] == ('index', None)
+
+
+def test_dict_with_required_keys():
+    '''Only required keys are kept, and a missing key raises KeyError.'''
+    content = {'a': 1, 'b': 2, 'c': 3}
+
+    assert dict_with_required_keys(content, ('a', 'b')) == {'a': 1, 'b': 2}
+
+    with pytest.raises(KeyError) as err:
+        dict_with_required_keys({'a': 1, 'b': None}, ('a', 'b'))
+
+    assert err.value.args == ('b',)
+
+
+def test_key_projector_project_many():
+    '''Incomplete records report every missing key by index.'''
+    project = KeyProjector(('a', 'b'))
+
+    records = iter([
+        {'a': 1, 'b': 2, 'c': 3},
+        {'c': 3},
+        {'a': 1, 'b': None},
+    ])
+
+    projected, missing = project.project_many(records)
+
+    assert projected == [{'a': 1, 'b': 2}]
+    assert missing == {1: ('a', 'b'), 2: ('b',)}
+
+
+def test_compile_converter_coerce_many():
+    '''Collect errors by index, matching the errors from coerce_datatypes.'''
+    convert = compile_converter(datatype_map)
+
+    records = (_ for _ in [
+        {'project': 'hello', 'index': '1'},
+        {'index': '1'},
+        {'project': 'hello', 'index': 'hello'},
+        {'project': 'hello'},
+    ])
+
+    coerced, errors = convert.coerce_many(records)
+
+    assert coerced == [
+        {'project': 'hello', 'index': 1},
+        {'project': 'hello', 'index': 2},
+    ]
+    assert list(errors) == [1, 2]
+    assert isinstance(errors[1], KeyError)
+    assert errors[1].args[1] == 'project'
+    assert isinstance(errors[2], ValueError)
+    assert errors[2].args[1] == ('index', 'hello')
+
+
+def test_compile_converter_fail_fast():
+    '''Raise the first error when fail_fast is set.'''
+    convert = compile_converter(datatype_map)
+
+    with pytest.raises(ValueError) as err:
+        convert.coerce_many([{'project': 'hello', 'index': None}], fail_fast=True)
+
+    assert err.value.args[1] == ('index', None)
+
+
+def test_compile_converter_missing_mapping():
+    '''Mappings with __missing__ are indexed like coerce_datatypes does, instead of using get.'''
+    convert = compile_converter(datatype_map)
+    data = defaultdict(lambda: '7', {'project': 'hello'})
+
+    assert convert(data) == coerce_datatypes(datatype_map, data) == {'project': 'hello', 'index': 7}
+
+
+def test_replace_keys():
+    '''Replace nested keys, and return untouched subtrees by reference.'''
+    untouched = {'other': [1, 2]}
+    item = [{'badKey': {'badKey': 1}}, untouched, ({'badKey': 2},)]
+
+    res = replace_keys(item, {'badKey': 'good_key'})
+
+    assert res == [{'good_key': {'good_key': 1}}, {'other': [1, 2]}, ({'good_key': 2},)]
+    assert res[1] is untouched
+    assert item[0] == {'badKey': {'badKey': 1}}
+
+
+def test_replace_keys_in_place():
+    '''Mutate dicts and lists in place, and rebuild tuples.'''
+    nested = {'a': 1}
+    item = {'list': [nested, nested], 'tuple': (MappingProxyType({'a': 2}),)}
+
+    res = replace_keys(item, {'a': 'b', 'b': 'c'}, in_place=True)
+
+    assert res is item
+    assert nested == {'b': 1}
+    assert item['list'] == [nested, nested]
+    assert item['tuple'] == ({'b': 2},)
+
+
+def test_replace_keys_deeply_nested():
+    '''Nesting deeper than the recursion limit does not raise RecursionError.'''
+    item = {}
+    for _ in range(5000):
+        item = {'badKey': [item]}
+
+    res = replace_keys(item, {'badKey': 'good_key'})
+
+    for _ in range(5000):
+        res = res['good_key'][0]
+
+    assert res == {}
+
+
+def test_replace_keys_deeply_nested_in_place():
+    '''Nesting past the recursive walk is renamed in place too.'''
+    item = innermost = {'badKey': 0}
+    for _ in range(5000):
+        item = {'badKey': [item]}
+
+    res = replace_keys(item, {'badKey': 'good_key'}, in_place=True)
+
+    assert res is item
+    for _ in range(5000):
+        res = res['good_key'][0]
+
+    assert res is innermost
+    assert innermost == {'good_key': 0}
+
+
+def test_replace_keys_namedtuple():
+    '''Changed namedtuples are rebuilt as plain tuples.'''
+    Pair = namedtuple('Pair', 'left right')
+
+    res = replace_keys(Pair({'badKey': 1}, None), {'badKey': 'good_key'})
+
+    assert type(res) is tuple
+    assert res == ({'good_key': 1}, None)
+
+
+def test_bidict():
+    '''Reverse index stays in step with inserts and deletes.'''
+    codes = BiDict(a='1', b='2')
+
+    assert get_key_by_val(codes, '2') == 'b'
+
+    codes['b'] = '3'
+    del codes['a']
+    codes.update(c='1')
+
+    assert dict(codes) == {'b': '3', 'c': '1'}
+    assert dict(codes.inverse) == {'3': 'b', '1': 'c'}
+    assert get_key_by_val(codes, '2') is None
+
+    with pytest.raises(ValueError):
+        codes['d'] = '3'
+
+    assert get_key_by_val(codes, '3') == 'b'
+
+
+def test_trim_values():
+    '''Trim strings nested in dicts, lists and tuples, and leave other values alone.'''
+    item = {'a': ' x ', 'b': [' y', {'c': ('z ', 1, None)}], 'd': 2.5}
+
+    assert trim_values(item) == {'a': 'x', 'b': ['y', {'c': ('z', 1, None)}], 'd': 2.5}
+    assert trim_records([{'a': ' x ', 'b': [' y']}]) == [{'a': 'x', 'b': [' y']}]
+    assert trim_records([{'a': ' x ', 'b': [' y']}], recursive=True) == [{'a': 'x', 'b': ['y']}]
+
+
+def test_get_keys_from_typed_dict():
+    '''Inherited keys are included.'''
+    class TestType(TypedDict):
+        field: float
+
+    class OtherTestType(TestType):
+        '''No annotations of its own.'''
+
+    assert get_keys_from_typed_dict(OtherTestType) == ('field',)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3.8
+'''
+Module to verify env utils work.
+'''
+from typing import Optional, TypedDict
+
+import pytest
+
+from python_utils.env_utils import getenv_int, load_env_config, refresh_env_config
+
+
+class Config(TypedDict):
+    NAME: str
+    RETRIES: int
+    DEBUG: bool
+    REGION: Optional[str]
+
+
+@pytest.fixture()
+def environ(monkeypatch):
+    refresh_env_config()
+    monkeypatch.setenv('NAME', ' "service" ')
+    monkeypatch.setenv('RETRIES', '3')
+    monkeypatch.delenv('DEBUG', raising=False)
+    monkeypatch.delenv('REGION', raising=False)
+    yield monkeypatch
+    refresh_env_config()
+
+
+def test_getenv_int(environ):
+    assert getenv_int('RETRIES', None) == 3
+    assert getenv_int('MISSING_RETRIES', 5) == 5
+
+
+def test_load_env_config(environ):
+    config = load_env_config(Config, defaults={'DEBUG': False})
+
+    assert config == {'NAME': 'service', 'RETRIES': 3, 'DEBUG': False, 'REGION': None}
+
+    with pytest.raises(TypeError):
+        config['NAME'] = 'other'
+
+    # cached until refreshed
+    environ.setenv('RETRIES', '4')
+    assert load_env_config(Config, defaults={'DEBUG': False}) is config
+
+    refresh_env_config()
+    assert load_env_config(Config, defaults={'DEBUG': False})['RETRIES'] == 4
+
+
+def test_load_env_config_reports_all_errors(environ):
+    environ.setenv('RETRIES', 'three')
+
+    with pytest.raises(EnvironmentError) as err:
+        load_env_config(Config)
+
+    assert 'Expected integer, found: "three"' in str(err.value)
+    assert 'You must set a vaild "DEBUG" in the environment.' in str(err.value)
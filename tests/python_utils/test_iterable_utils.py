@@ -2,7 +2,22 @@
 '''
 Module to verify iterable utils work.
 '''
-from python_utils.iterable_utils import partition
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count, islice
+
+import pytest
+
+from python_utils.iterable_utils import (
+    ParallelElementError,
+    PartitionBufferFull,
+    batched,
+    bucketize,
+    lazy_partition,
+    parallel_map,
+    parallel_partition,
+    partition,
+    windowed,
+)
 
 
 def test_partition():
@@ -25,3 +40,113 @@ def test_partition_types():
 
     assert strings == ('bob', 'janet')
     assert not_strings == (1, 3, 5, 8)
+
+
+def test_partition_generator():
+    less, more = partition((x for x in range(6)), lambda x: x < 3)
+
+    assert less == (0, 1, 2)
+    assert more == (3, 4, 5)
+
+
+def test_lazy_partition():
+    evens, odds = lazy_partition(count(), lambda x: x % 2 == 0)
+
+    assert list(islice(evens, 3)) == [0, 2, 4]
+    assert list(islice(odds, 3)) == [1, 3, 5]
+
+
+def test_lazy_partition_buffer_full():
+    small, big = lazy_partition(range(100), lambda x: x < 90, max_buffered=5)
+
+    with pytest.raises(PartitionBufferFull):
+        list(big)
+
+
+def test_lazy_partition_continue_after_buffer_full():
+    small, big = lazy_partition(range(20), lambda x: x < 10, max_buffered=5)
+
+    with pytest.raises(PartitionBufferFull):
+        next(big)
+
+    # no element is lost, once the other iterator has been read
+    assert list(islice(small, 10)) == list(range(10))
+    assert list(big) == list(range(10, 20))
+
+
+def test_bucketize():
+    buckets = bucketize([1, 'bob', 3.5, 'janet', 5], lambda x: type(x).__name__)
+
+    assert buckets == {'int': (1, 5), 'str': ('bob', 'janet'), 'float': (3.5,)}
+
+
+def test_parallel_map():
+    with ThreadPoolExecutor(4) as executor:
+        res = parallel_map(str, (x for x in range(1000)), executor, chunk_size=7)
+
+        assert list(res) == [str(x) for x in range(1000)]
+
+
+def test_parallel_map_error_index():
+    with ThreadPoolExecutor(2) as executor:
+        with pytest.raises(ParallelElementError) as err:
+            list(parallel_map(int, ['1', '2', 'three', '4'], executor, chunk_size=2))
+
+    assert err.value.index == 2
+    assert isinstance(err.value.error, ValueError)
+
+
+def test_parallel_map_bad_sizes():
+    with ThreadPoolExecutor(2) as executor:
+        for kwargs in ({'chunk_size': 0}, {'max_pending_chunks': 0}, {'worker_count': -1}):
+            with pytest.raises(ValueError):
+                parallel_map(str, range(10), executor, **kwargs)
+
+        res = parallel_map(str, range(10), executor, worker_count=1)
+
+        assert list(res) == [str(x) for x in range(10)]
+
+
+def test_parallel_partition():
+    input_list = ['1', 'bob', '3', 'janet', '5', '8'] * 50
+
+    with ProcessPoolExecutor(2) as executor:
+        digits, not_digits = parallel_partition(input_list, str.isdigit, executor)
+
+    assert (digits, not_digits) == partition(input_list, str.isdigit)
+
+
+def test_batched_streams():
+    batches = batched(count(), 3)
+
+    assert list(islice(batches, 3)) == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+
+
+def test_batched_max_bytes():
+    words = ['aaaa', 'bb', 'cc', 'd', 'eeeee', 'f', 'g', 'h']
+
+    res = list(batched(words, 3, max_bytes=5))
+
+    assert res == [['aaaa'], ['bb', 'cc', 'd'], ['eeeee'], ['f', 'g', 'h']]
+
+
+def test_batched_element_too_large():
+    with pytest.raises(ValueError):
+        list(batched(['a', 'bbbbbb'], 3, max_bytes=5))
+
+
+def test_batched_invalid_max_items():
+    with pytest.raises(ValueError):
+        batched([1, 2], 0)
+
+
+def test_windowed():
+    assert list(windowed(range(4), 2)) == [(0, 1), (1, 2), (2, 3)]
+    assert list(windowed(range(7), 2, step=3)) == [(0, 1), (3, 4)]
+    assert list(windowed(range(2), 3)) == []
+
+
+def test_windowed_streams():
+    windows = windowed(count(), 3, step=2)
+
+    assert list(islice(windows, 2)) == [(0, 1, 2), (2, 3, 4)]
@@ -1,12 +1,33 @@
 '''
 Test functions from json_utils module
 '''
+import io
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
 from decimal import Decimal
+from enum import Enum, IntEnum
+from uuid import UUID
 
+import numpy as np
 import pytest
+from immutables import Map
 
-from python_utils.json_utils import decimal_default
+from python_utils import json_utils
+from python_utils.iterable_utils import ParallelElementError
+from python_utils.json_utils import (
+    LazyDecimal,
+    NdjsonWriter,
+    decimal_default,
+    dump,
+    dumps,
+    dumps_bytes,
+    iter_dumps_bytes,
+    iter_ndjson,
+    json_default,
+    loads,
+    read_ndjson,
+)
 
 
 def test_default_raises():
@@ -26,3 +47,204 @@ def test_decimal_default():
     result = json.dumps(item, default=decimal_default)
 
     assert result == '{"x": 5.5}'
+
+
+def test_json_default():
+    item = {
+        'price': Decimal('5.5'),
+        'when': datetime(2020, 12, 1, 8, 30),
+        'day': date(2020, 12, 1),
+        'id': UUID(int=1),
+        'tags': frozenset(['a']),
+        'meta': Map(a=1),
+    }
+
+    result = json.dumps(item, default=json_default)
+
+    assert json.loads(result) == {
+        'price': 5.5,
+        'when': '2020-12-01T08:30:00',
+        'day': '2020-12-01',
+        'id': '00000000-0000-0000-0000-000000000001',
+        'tags': ['a'],
+        'meta': {'a': 1},
+    }
+
+
+def test_json_default_numpy():
+    item = {'count': np.int64(3), 'ratio': np.float32(0.5), 'values': np.arange(3)}
+
+    assert dumps(item) == '{"count":3,"ratio":0.5,"values":[0,1,2]}'
+
+
+def test_json_default_raises():
+    with pytest.raises(TypeError) as err:
+        dumps({'x': object()})
+
+    assert 'Object of type "object" is not JSON serializable' in str(err.value)
+
+
+def test_dumps_matches_decimal_default():
+    item = {'x': Decimal('5.5'), 'y': [Decimal('0.1'), 3, 'é']}
+
+    expected = json.dumps(item, default=decimal_default, separators=(',', ':'), ensure_ascii=False)
+
+    assert dumps(item) == expected
+    assert dumps_bytes(item) == expected.encode('utf-8')
+
+
+def test_dumps_not_compact():
+    '''compact=False gives the same output as json.dumps, in whole and in chunks.'''
+    item = {'x': Decimal('5.5'), 'y': [Decimal('0.1'), 3, 'é', '\ud800'] * 20, 'z': {'a': None}}
+
+    expected = json.dumps(item, default=decimal_default)
+
+    assert dumps(item, compact=False) == expected
+    assert b''.join(iter_dumps_bytes(item, chunk_size=16, compact=False)) == expected.encode('ascii')
+
+
+class Color(Enum):
+    RED = 'red'
+
+
+class Size(IntEnum):
+    LARGE = 3
+
+
+@pytest.mark.skipif(json_utils.orjson is None, reason='orjson is not installed')
+@pytest.mark.parametrize('item', [
+    [1e16, 1.5e-7, 0.00001, 0.0001, -2.5e300, 123.456],
+    {'small': Decimal('0.000012'), 'large': Decimal('12345678901234567890')},
+    {1: 'non string key'},
+    [2 ** 70],
+    {'id': UUID(int=255), 'when': datetime(2020, 12, 1, tzinfo=timezone.utc), 'text': 'ü "1e5"\n'},
+    {'color': Color.RED, 'size': Size.LARGE},
+    ['lone \ud800 surrogate', 'é'],
+])
+def test_backends_identical(item):
+    assert json_utils._orjson_dumps_bytes(item) == json_utils._stdlib_dumps_bytes(item)
+
+
+@pytest.mark.parametrize('item', [
+    {'items': [{'price': Decimal('1.5'), 'id': i} for i in range(100)], 'count': 100, 'empty': []},
+    [{'x': i} for i in range(100)],
+    ({'x': 1}, 'b'),
+    {1: 'non string key'},
+    [],
+    'just a string',
+])
+def test_iter_dumps_bytes(item):
+    chunks = list(iter_dumps_bytes(item, chunk_size=64))
+
+    assert b''.join(chunks) == dumps_bytes(item)
+    assert all(len(chunk) >= 64 for chunk in chunks[:-1])
+
+
+def test_dump():
+    item = {'items': [Decimal('0.1')] * 1000}
+    fp = io.BytesIO()
+
+    written = dump(item, fp, chunk_size=100)
+
+    assert fp.getvalue() == dumps_bytes(item)
+    assert written == len(fp.getvalue())
+
+
+@pytest.mark.parametrize('numbers', ['float', 'decimal', 'lazy_decimal'])
+def test_loads_matches_json_module(numbers):
+    text = '{"a": [1, -2, 3.5, 1e3, 2e-7], "b": "é", "c": null, "d": true, "e": NaN}'
+    parse_float = {'float': float, 'decimal': Decimal, 'lazy_decimal': Decimal}[numbers]
+
+    result = loads(text, numbers)
+    expected = json.loads(text, parse_float=parse_float)
+
+    assert result['a'] == expected['a']
+    assert result['b'] == expected['b']
+    assert result['c'] is None and result['d'] is True
+    assert loads(text.encode('utf-8'), numbers)['a'] == expected['a']
+
+
+def test_loads_decimal_keeps_precision():
+    result = loads('{"price": 0.1000000000000000055511151231257827}', numbers='decimal')
+
+    assert result['price'] == Decimal('0.1000000000000000055511151231257827')
+
+
+def test_loads_lazy_decimal():
+    price = loads('{"price": 5.10}', numbers='lazy_decimal')['price']
+
+    assert isinstance(price, LazyDecimal)
+    assert price == Decimal('5.1')
+    assert price.decimal is price.decimal
+    assert float(price) == 5.1
+    assert dumps({'price': price}) == '{"price":5.1}'
+
+
+@pytest.mark.parametrize('number', [
+    123456789012345678901234567890,
+    2 ** 64,
+    -2 ** 63 - 1,
+    2 ** 64 - 1,
+])
+def test_loads_keeps_big_integers(number):
+    text = f'{{"a": {number}}}'
+
+    assert loads(text) == {'a': number}
+    assert loads(text.encode('utf-8')) == {'a': number}
+    assert isinstance(loads(text)['a'], int)
+    assert list(iter_ndjson(io.BytesIO(text.encode('utf-8')))) == [{'a': number}]
+
+
+def test_loads_errors():
+    with pytest.raises(json.JSONDecodeError):
+        loads('{"price": ')
+
+    with pytest.raises(ValueError):
+        loads('[]', numbers='int')
+
+
+NDJSON_RECORDS = [{'id': i, 'price': Decimal(f'{i}.25'), 'name': f'item {i}'} for i in range(50)]
+
+
+def test_ndjson_round_trip(tmp_path):
+    path = tmp_path / 'records.ndjson'
+
+    with open(path, 'wb') as fp, NdjsonWriter(fp, buffer_size=100) as writer:
+        writer.write(NDJSON_RECORDS[0])
+        writer.write_many(NDJSON_RECORDS[1:])
+
+    assert list(read_ndjson(str(path), numbers='decimal')) == NDJSON_RECORDS
+
+
+def test_iter_ndjson_lines_across_blocks():
+    text = b'{"a": 1}\r\n\r\n  \n[2.5, "x"]\n3'
+
+    assert list(iter_ndjson(io.BytesIO(text), block_size=3)) == [{'a': 1}, [2.5, 'x'], 3]
+    assert list(iter_ndjson(io.StringIO(text.decode()), block_size=3)) == [{'a': 1}, [2.5, 'x'], 3]
+
+
+def test_iter_ndjson_executor():
+    text = b''.join(dumps_bytes(record) + b'\n' for record in NDJSON_RECORDS)
+
+    with ThreadPoolExecutor(2) as executor:
+        records = list(iter_ndjson(io.BytesIO(text), numbers='decimal', executor=executor))
+
+    assert records == NDJSON_RECORDS
+
+
+def test_iter_ndjson_errors():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_ndjson(io.BytesIO(b'[1]\n{"a": \n')))
+
+    with ThreadPoolExecutor(2) as executor:
+        with pytest.raises(ParallelElementError) as err:
+            list(iter_ndjson(io.BytesIO(b'[1]\n{"a": \n'), executor=executor))
+
+    assert err.value.index == 1
+
+
+def test_read_ndjson_empty_file(tmp_path):
+    path = tmp_path / 'empty.ndjson'
+    path.write_bytes(b'')
+
+    assert list(read_ndjson(str(path))) == []
@@ -0,0 +1,192 @@
+'''
+Test functions from jwt_utils module
+'''
+import base64
+import hashlib
+import hmac
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from python_utils.jwt_utils import (
+    InvalidJwt,
+    JwkCache,
+    JwtCache,
+    JwtComponents,
+    JwtVerifier,
+    get_jwt_token_components,
+)
+
+
+def _encode_component(component: dict) -> str:
+    encoded = base64.urlsafe_b64encode(json.dumps(component).encode('utf-8'))
+    return encoded.decode('ascii').rstrip('=')
+
+
+def _make_token(payload: dict) -> str:
+    header = _encode_component({'alg': 'HS256', 'typ': 'JWT'})
+    return f'Bearer {header}.{_encode_component(payload)}.c2lnbmF0dXJl'
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_jwt_components_match_dict():
+    token = _make_token({'sub': 'bob', 'exp': 2000})
+
+    assert JwtComponents(token) == get_jwt_token_components(token)
+
+
+def test_jwt_components_decode_lazily():
+    token = 'Bearer eyJhbGciOiJIUzI1NiJ9.bm90IGpzb24.c2ln'
+    components = JwtComponents(token)
+
+    assert components['jwt_header'] == {'alg': 'HS256'}
+    assert components['jwt_signature'] == 'c2ln'
+
+    with pytest.raises(ValueError):
+        components['jwt_payload']
+
+
+def test_jwt_cache_hits_and_misses():
+    cache = JwtCache(clock=FakeClock(1000))
+    token = _make_token({'sub': 'bob', 'exp': 2000})
+
+    first = cache.get(token)
+    second = cache.get(token)
+
+    assert first is second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_jwt_cache_expiry():
+    clock = FakeClock(1000)
+    cache = JwtCache(clock=clock)
+    token = _make_token({'sub': 'bob', 'exp': 2000})
+    cache.get(token)
+
+    clock.now = 2000
+    components = cache.get(token)
+
+    assert components['jwt_payload']['sub'] == 'bob'
+    assert cache.misses == 2
+    assert len(cache) == 0
+
+
+def test_jwt_cache_evicts_least_recently_used():
+    cache = JwtCache(maxsize=2, clock=FakeClock(1000))
+    tokens = [_make_token({'sub': name}) for name in ('a', 'b', 'c')]
+
+    cache.get(tokens[0])
+    cache.get(tokens[1])
+    cache.get(tokens[0])
+    cache.get(tokens[2])
+
+    cache.get(tokens[0])
+    assert cache.hits == 2
+
+    cache.get(tokens[1])
+    assert cache.misses == 4
+
+
+HMAC_SECRET = b'super secret key'
+HMAC_JWKS = {'keys': [
+    {'kty': 'oct', 'kid': 'hmac-1', 'alg': 'HS256', 'k': base64.urlsafe_b64encode(HMAC_SECRET).decode()},
+]}
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _sign_token(header: dict, payload: dict, sign) -> str:
+    signing_input = f'{_encode_component(header)}.{_encode_component(payload)}'
+    return f'Bearer {signing_input}.{_b64encode(sign(signing_input.encode("ascii")))}'
+
+
+def _hs256_token(payload: dict, kid='hmac-1', secret=HMAC_SECRET) -> str:
+    sign = lambda signing_input: hmac.new(secret, signing_input, hashlib.sha256).digest()
+    return _sign_token({'alg': 'HS256', 'kid': kid}, payload, sign)
+
+
+def test_verify_hs256():
+    verifier = JwtVerifier(JwkCache(HMAC_JWKS), clock=FakeClock(1000))
+    token = _hs256_token({'sub': 'bob', 'exp': 2000})
+
+    assert verifier.verify(token)['jwt_payload'] == {'sub': 'bob', 'exp': 2000}
+
+    verifier.verify(token)
+    assert verifier.verified.hits == 1
+
+
+@pytest.mark.parametrize('token, message', [
+    (_hs256_token({'sub': 'bob'}, secret=b'wrong key'), 'Signature does not match'),
+    (_hs256_token({'sub': 'bob', 'exp': 1000}), 'Token has expired'),
+    (_hs256_token({'sub': 'bob', 'nbf': 1500}), 'Token is not valid yet'),
+    (_hs256_token({'sub': 'bob'}, kid='missing'), 'No key with id "missing"'),
+    (_sign_token({'alg': 'none', 'kid': 'hmac-1'}, {'sub': 'bob'}, lambda _: b''), 'does not match key alg'),
+    ('Bearer not-a-token', 'Malformed token'),
+    (_hs256_token({'sub': 'bob'}) + '!!!', 'Malformed token'),
+    (_hs256_token({'sub': 'bob'}) + '.$', 'Malformed token'),
+])
+def test_verify_invalid(token, message):
+    verifier = JwtVerifier(JwkCache(HMAC_JWKS), clock=FakeClock(1000))
+
+    with pytest.raises(InvalidJwt) as err:
+        verifier.verify(token)
+
+    assert message in str(err.value)
+
+
+def test_verify_rs256(tmp_path):
+    pytest.importorskip('cryptography')
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_numbers = private_key.public_key().public_numbers()
+    jwks = {'keys': [{
+        'kty': 'RSA',
+        'kid': 'rsa-1',
+        'alg': 'RS256',
+        'n': _b64encode(public_numbers.n.to_bytes(256, 'big')),
+        'e': _b64encode(public_numbers.e.to_bytes(3, 'big')),
+    }]}
+    path = tmp_path / 'jwks.json'
+    path.write_text(json.dumps(jwks))
+
+    keys = JwkCache()
+    keys.load_file(str(path))
+    verifier = JwtVerifier(keys, clock=FakeClock(1000))
+
+    sign = lambda signing_input: private_key.sign(signing_input, padding.PKCS1v15(), hashes.SHA256())
+    token = _sign_token({'alg': 'RS256', 'kid': 'rsa-1'}, {'sub': 'bob', 'exp': 2000}, sign)
+
+    assert verifier.verify(token)['jwt_payload']['sub'] == 'bob'
+
+    # an HS256 token signed with the public key as the secret must not pass
+    forged = _hs256_token({'sub': 'eve'}, kid='rsa-1', secret=json.dumps(jwks['keys'][0]).encode())
+
+    with pytest.raises(InvalidJwt):
+        verifier.verify(forged)
+
+
+def test_verify_many():
+    verifier = JwtVerifier(JwkCache(HMAC_JWKS), clock=FakeClock(1000))
+    tokens = [_hs256_token({'sub': str(i), 'exp': 2000}) for i in range(20)]
+    tokens[5] = _hs256_token({'sub': 'eve'}, secret=b'wrong key')
+
+    with ThreadPoolExecutor(4) as executor:
+        verified, errors = verifier.verify_many(tokens, executor)
+
+    assert [components['jwt_payload']['sub'] for components in verified] == [
+        str(i) for i in range(20) if i != 5
+    ]
+    assert list(errors) == [5]
+    assert isinstance(errors[5], InvalidJwt)
@@ -1,9 +1,26 @@
+import io
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+from decimal import Decimal
 from importlib import reload
 
 import pytest
 
-from python_utils.logging_utils import initialize_logger, lazy_evaluate_string
+from python_utils import logging_utils
+from python_utils.logging_utils import (
+    BoundedQueueHandler,
+    JsonFormatter,
+    LazyString,
+    flush_logs,
+    flush_logs_after,
+    initialize_logger,
+    lazy_evaluate_string,
+    lazy_log,
+    remove_handlers,
+)
 
 
 @pytest.fixture()
@@ -68,3 +85,204 @@ def test_lazy_evaluate_string(capsys, reset_logger):
     # verify the result from test_func actually gets printed
     _, stderr = capsys.readouterr()
     assert 'result' in stderr
+
+
+@pytest.fixture()
+def reset_queue_logger(reset_logger):
+    yield
+    remove_handlers()
+
+
+def test_initialize_logger_queue(capsys, reset_queue_logger):
+    initialize_logger('INFO', use_queue=True)
+
+    logging.getLogger('queued').warning('logged from %s', 'a queue')
+    flush_logs()
+
+    _, stderr = capsys.readouterr()
+    assert 'WARNING  - ' in stderr
+    assert ' - queued - logged from a queue' in stderr
+    assert isinstance(logging.root.handlers[0], BoundedQueueHandler)
+
+
+def test_initialize_logger_queue_existing_handlers(reset_queue_logger):
+    '''Handlers already on root, like lambda's, are written to through the queue.'''
+    stream = io.StringIO()
+    existing_handler = logging.StreamHandler(stream)
+    existing_handler.setFormatter(logging.Formatter('LAMBDA %(levelname)s %(message)s'))
+    logging.root.addHandler(existing_handler)
+
+    initialize_logger('INFO', use_queue=True)
+
+    logging.getLogger('queued').warning('logged from %s', 'a queue')
+    flush_logs()
+
+    assert len(logging.root.handlers) == 1
+    assert isinstance(logging.root.handlers[0], BoundedQueueHandler)
+    assert logging_utils._QUEUE_LISTENER.handlers == (existing_handler,)
+    assert 'LAMBDA WARNING logged from a queue' in stream.getvalue()
+
+
+def test_flush_logs_after(capsys, reset_queue_logger):
+    initialize_logger('INFO', use_queue=True)
+
+    @flush_logs_after
+    def handler(event, context):
+        logging.info('handling %s', event)
+        return 'done'
+
+    assert handler('event', None) == 'done'
+    assert logging_utils._QUEUE_LISTENER.queue.unfinished_tasks == 0
+
+    _, stderr = capsys.readouterr()
+    assert 'handling event' in stderr
+
+
+def test_bounded_queue_handler_drops():
+    handler = BoundedQueueHandler(queue.Queue(1))
+    logger = logging.getLogger('dropping')
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    try:
+        for i in range(3):
+            logger.warning('record %s', i)
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.dropped == 2
+    assert handler.queue.get_nowait().getMessage() == 'record 0'
+
+
+def _make_record(msg, args=(), extra=None, exc_info=None):
+    record = logging.LogRecord('app', logging.INFO, 'app.py', 1, msg, args, exc_info)
+    record.created, record.msecs = 1600000000.0, 250
+
+    for key, value in (extra or {}).items():
+        setattr(record, key, value)
+
+    return record
+
+
+def test_json_formatter():
+    record = _make_record('took %s ms', (Decimal('1.5'),), extra={'request_id': 'abc'})
+
+    assert json.loads(JsonFormatter().format(record)) == {
+        'level': 'INFO',
+        'time': '2020-09-13T12:26:40.250Z',
+        'logger': 'app',
+        'message': 'took 1.5 ms',
+        'request_id': 'abc',
+    }
+
+
+def test_json_formatter_structured_args():
+    # a single dict argument is added as fields, if the message has no placeholders for it
+    record = _make_record('paid', ({'amount': Decimal('5.25'), 'message': 'ignored'},))
+
+    fields = json.loads(JsonFormatter().format(record))
+    assert fields['message'] == 'paid'
+    assert fields['amount'] == 5.25
+
+
+def test_json_formatter_dict_placeholder():
+    # a dict logged with %s is formatted into the message, not spread into fields
+    record = _make_record('Success response: %s', ({'level': 'x', 'amount': 5},))
+
+    fields = json.loads(JsonFormatter().format(record))
+    assert fields['message'] == "Success response: {'level': 'x', 'amount': 5}"
+    assert fields['level'] == 'INFO'
+    assert 'amount' not in fields
+
+
+def test_json_formatter_time_cache():
+    formatter = JsonFormatter()
+    first = _make_record('first')
+    second = _make_record('second')
+    second.msecs = 999
+    later = _make_record('later')
+    later.created += 61
+
+    assert formatter.formatTime(first) == '2020-09-13T12:26:40.250Z'
+    assert formatter.formatTime(second) == '2020-09-13T12:26:40.999Z'
+    assert formatter.formatTime(later) == '2020-09-13T12:27:41.250Z'
+
+
+def test_json_formatter_exception_and_unserializable():
+    try:
+        raise ValueError('bad value')
+    except ValueError:
+        record = _make_record('failed', extra={'thing': object()}, exc_info=sys.exc_info())
+
+    fields = json.loads(JsonFormatter().format(record))
+    assert 'ValueError: bad value' in fields['exception']
+    assert fields['thing'].startswith('<object object')
+
+
+def test_initialize_logger_json(capsys, reset_logger):
+    initialize_logger('INFO', json_format=True)
+    capsys.readouterr()
+
+    logging.getLogger('structured').warning('order placed', {'order_id': 7})
+
+    _, stderr = capsys.readouterr()
+    fields = json.loads(stderr)
+    assert fields['logger'] == 'structured'
+    assert fields['message'] == 'order placed'
+    assert fields['order_id'] == 7
+
+
+def test_initialize_logger_queue_json(capsys, reset_queue_logger):
+    initialize_logger('INFO', use_queue=True, json_format=True)
+    flush_logs()
+    capsys.readouterr()
+
+    logging.getLogger('queued').warning('order placed', {'order_id': 7}, extra={'user': 'bob'})
+    flush_logs()
+
+    _, stderr = capsys.readouterr()
+    fields = json.loads(stderr)
+    assert fields['order_id'] == 7
+    assert fields['user'] == 'bob'
+
+
+def test_lazy_string_memoizes():
+    calls = []
+
+    def render(prefix, suffix=''):
+        calls.append(prefix)
+        return prefix + suffix
+
+    lazy = LazyString(render, 'a', suffix='b')
+
+    assert str(lazy) == 'ab'
+    assert str(lazy) == 'ab'
+    assert calls == ['a']
+
+
+def test_lazy_log():
+    log_queue = queue.Queue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    logger = logging.getLogger('lazy')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    calls = []
+
+    def render(rows, sep=', '):
+        calls.append(rows)
+        return sep.join(rows)
+
+    try:
+        lazy_log(logger, logging.DEBUG, 'rows: %s', render, ['a', 'b'])
+        assert calls == []
+        assert log_queue.empty()
+
+        lazy_log(logger, logging.INFO, 'rows: %s', render, ['a', 'b'], sep='|')
+    finally:
+        logger.removeHandler(handler)
+
+    record = log_queue.get_nowait()
+    assert record.getMessage() == 'rows: a|b'
+    assert record.funcName == 'test_lazy_log'
+    assert calls == [['a', 'b']]
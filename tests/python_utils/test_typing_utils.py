@@ -2,11 +2,26 @@
 '''
 Module to verify typing utils work.
 '''
-from typing import Dict, TypedDict, Union, Optional, List
+import sys
+import threading
+from typing import Dict, TypedDict, Tuple, Union, Optional, List
 
+import numpy as np
 import pytest
 
-from python_utils.typing_utils import verify_type, is_typed_dict, is_list_with_specified_data_type, is_generic_type
+from python_utils.typing_utils import (
+    _compile,
+    compile_validator,
+    filter_valid,
+    get_typed_dict_schema,
+    is_generic_type,
+    is_instance_of,
+    is_list_with_specified_data_type,
+    is_typed_dict,
+    validate_batch,
+    verify_homogeneous_list,
+    verify_type,
+)
 
 
 def test_is_typed_dict():
@@ -396,3 +411,200 @@ def test_verify_type_optional_specified_dict_with_error():
         "must be of the following types: ['TestType', 'str'], not dict",
         'other_field',
     )
+
+
+def test_get_typed_dict_schema():
+    class TestType(TypedDict, total=False):
+        field: float
+        other_field: List[str]
+
+    schema = get_typed_dict_schema(TestType)
+
+    assert schema.keys == ('field', 'other_field')
+    assert schema.type_hints == {'field': float, 'other_field': List[str]}
+    assert schema.required_keys == set()
+    assert schema.optional_keys == {'field', 'other_field'}
+
+    # resolved once, then read from the registry
+    assert get_typed_dict_schema(TestType) is schema
+
+    with pytest.raises(TypeError):
+        get_typed_dict_schema(dict)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 9), reason='python 3.8 does not record TypedDict parents')
+def test_get_typed_dict_schema_inherited():
+    class TestType(TypedDict):
+        field: float
+
+    class OtherTestType(TestType, total=False):
+        other_field: List[str]
+
+    schema = get_typed_dict_schema(OtherTestType)
+
+    assert schema.keys == ('field', 'other_field')
+    assert schema.required_keys == {'field'}
+    assert schema.optional_keys == {'other_field'}
+
+
+def _outcome(func, *args):
+    '''Return the type and args of the exception func raises, or None.'''
+    try:
+        func(*args)
+    except (TypeError, KeyError) as err:
+        return type(err), err.args
+    return None
+
+
+def test_compile_validator_matches_verify_type():
+    class TestType(TypedDict):
+        field: float
+
+    class OtherTestType(TypedDict):
+        other_field: Union[TestType, str]
+        items: List[TestType]
+        mapping: Dict[str, int]
+
+    test_cases = (
+        ('hey', str),
+        (1, str),
+        ([1, 2], List[int]),
+        ([1, 'two'], List[int]),
+        ('not list', List[int]),
+        ({'field': 2.0}, TestType),
+        ({'field': 2}, TestType),
+        ({'wrong_field': 2.0}, TestType),
+        ({'other_field': 'x', 'items': [{'field': 1.0}], 'mapping': {'a': 1}}, OtherTestType),
+        ({'other_field': {'field': 2}, 'items': [], 'mapping': {}}, OtherTestType),
+        ({'other_field': 'x', 'items': [{'field': 1}], 'mapping': {}}, OtherTestType),
+        ({'other_field': 'x', 'items': [], 'mapping': {'a': 'b'}}, OtherTestType),
+        ({'other_field': 'x', 'items': []}, OtherTestType),
+        ('2', Optional[float]),
+        (None, Optional[float]),
+    )
+
+    for subject, expected_type in test_cases:
+        validate = compile_validator(expected_type)
+
+        assert _outcome(validate, subject, 'body') == _outcome(verify_type, subject, expected_type, 'body')
+        assert is_instance_of(subject, expected_type) == (_outcome(verify_type, subject, expected_type) is None)
+
+    assert compile_validator(List[TestType]) is compile_validator(List[TestType])
+
+
+class UnsupportedSelfReferencingType(TypedDict):
+    kids: List['UnsupportedSelfReferencingType']
+    pair: Tuple[int, int]
+
+
+def test_compile_failure_leaves_no_placeholders():
+    '''A failed build does not cache functions that forward to the function never built.'''
+    subject = [{'kids': [], 'pair': (1, 2)}]
+
+    with pytest.raises(TypeError):
+        compile_validator(UnsupportedSelfReferencingType)
+
+    with pytest.raises(TypeError):
+        compile_validator(List[UnsupportedSelfReferencingType])(subject)
+
+    with pytest.raises(TypeError):
+        is_instance_of(subject[0], UnsupportedSelfReferencingType)
+
+    with pytest.raises(TypeError):
+        is_instance_of(subject, List[UnsupportedSelfReferencingType])
+
+
+def test_compile_caches_only_finished_builds():
+    '''Other threads never see a function that is still being built.'''
+    cache = {}
+    building = threading.Event()
+    finish = threading.Event()
+    seen = []
+
+    def build(expected_type):
+        if expected_type == 'outer':
+            inner = _compile('inner', cache, build)
+            building.set()
+            finish.wait(5)
+            return lambda: inner()
+
+        return lambda: 'inner'
+
+    thread = threading.Thread(target=_compile, args=('outer', cache, build))
+    thread.start()
+    building.wait(5)
+    seen.append(dict(cache))
+    finish.set()
+    thread.join(5)
+
+    assert seen == [{}]
+    assert cache['outer']() == 'inner'
+
+
+def test_filter_valid():
+    class TestType(TypedDict):
+        field: float
+
+    subjects = iter([{'field': 1.0}, {'field': 1}, 'string', [1], {'other': 2.0}, {'field': 3.0}])
+
+    valid = filter_valid(subjects, Union[TestType, List[int], None])
+
+    assert list(valid) == [{'field': 1.0}, [1], {'field': 3.0}]
+
+
+def test_validate_batch():
+    class TestType(TypedDict):
+        field: float
+        items: List[int]
+
+    records = [
+        {'field': 1.0, 'items': [1]},
+        {'field': 1, 'items': [1, 'two']},
+        {'items': []},
+        'not a dict',
+    ]
+
+    assert validate_batch(records, TestType) == [
+        {'index': 1, 'path': '$.field', 'expected': 'float', 'actual': 'int'},
+        {'index': 1, 'path': '$.items[1]', 'expected': 'int', 'actual': 'str'},
+        {'index': 2, 'path': '$.field', 'expected': 'float', 'actual': 'missing'},
+        {'index': 3, 'path': '$', 'expected': 'TestType', 'actual': 'str'},
+    ]
+
+    # stop early once max_errors are found
+    assert len(validate_batch(records, TestType, max_errors=2)) == 2
+    assert validate_batch(records[:1], TestType) == []
+
+    for max_errors in (0, -1):
+        with pytest.raises(ValueError):
+            validate_batch(records, TestType, max_errors=max_errors)
+
+
+def test_verify_type_primitive_list():
+    '''Lists of primitives report the first bad element with the item label.'''
+    verify_type([1, 2, True], List[int], 'numbers')
+
+    with pytest.raises(TypeError) as e:
+        verify_type([1.0, 2.0, 3, 'four'], List[float], 'numbers')
+    assert e.value.args == ('must be float, not int', 'item in numbers')
+
+    assert compile_validator(List[str])(['a', 'b']) is None
+    assert is_instance_of([1, 'b'], List[int]) is False
+
+
+def test_verify_homogeneous_list():
+    verify_homogeneous_list([1, 2], int)
+    verify_homogeneous_list(np.arange(5), int)
+    verify_homogeneous_list(np.array(['a', 'b']), str)
+    verify_homogeneous_list(np.array([1.5, 'x'], dtype=object)[:1], float)
+
+    with pytest.raises(TypeError) as e:
+        verify_homogeneous_list(np.arange(5.0), int, 'numbers')
+    assert e.value.args == ('must be int, not float64', 'item in numbers')
+
+    with pytest.raises(TypeError) as e:
+        verify_homogeneous_list(np.array([1.5, 'x'], dtype=object), float, 'numbers')
+    assert e.value.args == ('must be float, not str', 'item in numbers')
+
+    with pytest.raises(TypeError):
+        verify_homogeneous_list([{}], dict)
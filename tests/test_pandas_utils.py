@@ -1,6 +1,20 @@
+import math
+import random
+from datetime import date
+from typing import List, Optional, TypedDict
+
+import pandas as pd
 import pytest
 
-from pandas_utils import validate_required_sheet_fields, InvalidSpreadSheet
+from pandas_utils import (
+    InvalidSpreadSheet,
+    coerce_dataframe,
+    df_to_dict,
+    trim_dataframe,
+    validate_dataframe,
+    validate_required_sheet_fields,
+)
+from python_utils.dict_utils import coerce_datatypes
 
 def test_validate_required_sheet_fields():
     # does contain required field, no exception raised
@@ -17,3 +31,139 @@ def test_validate_required_sheet_fields():
         validate_required_sheet_fields(mock_sheet_bad, {'SSO', 'Effective Date', 'Access Granted'})
 
     assert 'Uploaded sheet is missing the following required columns:' in str(err.value)
+
+
+def test_coerce_dataframe():
+    '''Vectorized coercion matches coerce_datatypes on every row.'''
+    datatype_map = {
+        'project': {'conversion_function': str},
+        'index': {'conversion_function': int, 'default': 2},
+        'amount': {'conversion_function': float},
+        'day': {'conversion_function': date.fromisoformat},
+        'flag': {'conversion_function': bool},
+        'custom': {'conversion_function': str.upper},
+    }
+    df = pd.DataFrame({
+        'project': ['a', 'b'],
+        'amount': ['1.5', '2'],
+        'day': ['2021-01-02', '2021-03-04'],
+        'flag': [0, 1],
+        'custom': ['x', 'y'],
+        'extra': ['ignored', 'ignored'],
+    })
+
+    res = coerce_dataframe(df, datatype_map)
+
+    assert df_to_dict(res) == [
+        coerce_datatypes(datatype_map, row) for row in df_to_dict(df)
+    ]
+
+
+def test_coerce_dataframe_errors():
+    '''Errors have the same shape as coerce_datatypes, with all bad row indices.'''
+    df = pd.DataFrame({'index': ['1', 'two', '3', 'four']})
+
+    with pytest.raises(ValueError) as err:
+        coerce_dataframe(df, {'index': {'conversion_function': int}})
+
+    assert err.value.args[1] == ('index', [1, 3])
+
+    with pytest.raises(KeyError) as err:
+        coerce_dataframe(df, {'project': {'conversion_function': str}})
+
+    assert err.value.args[1] == 'project'
+
+
+@pytest.mark.parametrize('values', [
+    [1e20, 2.0, -2.0 ** 63],
+    ['\u0663', ' 4 ', '10000000000000000000', '5\u2003'],
+    pd.Series([2 ** 64 - 1, 3], dtype='uint64'),
+])
+def test_coerce_dataframe_int_outside_vectorized_cast(values):
+    '''Values the int64 cast cannot hold exactly are converted by int().'''
+    datatype_map = {'index': {'conversion_function': int}}
+    df = pd.DataFrame({'index': values})
+
+    assert df_to_dict(coerce_dataframe(df, datatype_map)) == [
+        coerce_datatypes(datatype_map, row) for row in df_to_dict(df)
+    ]
+
+
+def test_coerce_dataframe_float_strings():
+    '''Float strings are rounded exactly like float(), which to_numeric is not.'''
+    random.seed(0)
+    values = [repr(random.uniform(-1, 1) * 10 ** random.randint(-300, 300)) for _ in range(1000)]
+    values += ['1_000.5', 'nan', ' 2.5 ']
+    datatype_map = {'value': {'conversion_function': float}}
+    df = pd.DataFrame({'value': values})
+
+    res = coerce_dataframe(df, datatype_map)['value'].tolist()
+
+    assert res[:-2] == [float(_) for _ in values[:-2]]
+    assert math.isnan(res[-2])
+    assert res[-1] == 2.5
+
+    with pytest.raises(ValueError) as err:
+        coerce_dataframe(pd.DataFrame({'value': ['1.5', 'x', '2', 'y']}), datatype_map)
+
+    assert err.value.args[1] == ('value', [1, 3])
+
+
+def test_trim_dataframe():
+    '''Trim string and mixed columns, without changing the original.'''
+    df = pd.DataFrame({
+        'strings': [' a ', 'b '],
+        'mixed': pd.Series([' c', 1], dtype=object),
+        'numbers': [1.5, 2.5],
+    })
+
+    res = trim_dataframe(df)
+
+    assert df_to_dict(res) == [
+        {'strings': 'a', 'mixed': 'c', 'numbers': 1.5},
+        {'strings': 'b', 'mixed': 1, 'numbers': 2.5},
+    ]
+    assert df['strings'].tolist() == [' a ', 'b ']
+
+
+def test_validate_dataframe():
+    '''Bad rows are reported per column, and Optional columns allow nulls.'''
+    class Row(TypedDict):
+        name: str
+        count: int
+        note: Optional[str]
+        tags: List[str]
+
+    df = pd.DataFrame({
+        'name': ['a', None, 'c'],
+        'count': [1.0, 2.5, None],
+        'note': [None, 'x', 3],
+        'tags': [['a'], ['b', 1], ['c']],
+    })
+
+    assert validate_dataframe(df, Row) == {
+        'name': [1],
+        'count': [1, 2],
+        'note': [2],
+        'tags': [1],
+    }
+
+    with pytest.raises(InvalidSpreadSheet):
+        validate_dataframe(df[['name']], Row)
+
+
+def test_validate_dataframe_typed_dict_column():
+    '''Columns of nested TypedDicts are checked element by element.'''
+    class Inner(TypedDict):
+        x: int
+
+    class Row(TypedDict):
+        inner: Inner
+        maybe_inner: Optional[Inner]
+
+    df = pd.DataFrame({
+        'inner': [{'x': 1}, {'x': 'a'}, None],
+        'maybe_inner': [None, {'x': 2}, {'y': 3}],
+    })
+
+    assert validate_dataframe(df, Row) == {'inner': [1, 2], 'maybe_inner': [2]}